@@ -4,19 +4,37 @@ try:
 except ImportError:
     pass
 
-from flask import Flask, render_template, request, jsonify, Response, send_file, session, redirect, url_for
+from flask import Flask, current_app, render_template, request, jsonify, Response, send_file, session, redirect, url_for, stream_with_context
 from flask_cors import CORS
-import io, os, sys, time, json, threading, uuid, logging, re
+import io, os, sys, time, json, threading, uuid, logging, re, tempfile
 from pathlib import Path
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
+from typing import Optional
 from logging.handlers import RotatingFileHandler
+from werkzeug.exceptions import MethodNotAllowed, NotFound
 from werkzeug.security import check_password_hash, generate_password_hash
 from config import config
 from scripts.utils import db, Transaccion, LoteCarga, Usuario, ReporteGenerado, Ente, CONTABLE_GENEROS
-from scripts.utils import process_files_to_database
-from sqlalchemy import func, and_, or_, inspect, text
-from sqlalchemy.exc import IntegrityError
+from scripts.utils import ACCENT_TRANSLATION
+from scripts.utils import process_files_to_database, _map_input_file
+from sqlalchemy import func, and_, or_, case, inspect, select, text, tuple_, Numeric
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 WORKSPACE_ROOT = Path(__file__).resolve().parent.parent
 if str(WORKSPACE_ROOT) not in sys.path:
@@ -24,9 +42,25 @@ if str(WORKSPACE_ROOT) not in sys.path:
 
 from shared_user_catalog import get_project_role, list_users
 
+@dataclass(frozen=True, slots=True)
+class JobSnapshot:
+    """Estado inmutable de un trabajo de carga; cada cambio publica uno nuevo"""
+    progress: int = 0
+    message: str = ""
+    done: bool = False
+    error: Optional[str] = None
+    current_file: Optional[str] = None
+    lote_id: Optional[str] = None
+    total_registros: int = 0
+
+
 def create_app(config_name="default"):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    # Rutas con o sin "/" final responden igual (sin redirección 308)
+    app.url_map.strict_slashes = False
+    # JSON compacto también en modo debug
+    app.json.compact = True
     preferred_user_display = {
         user["usuario"]: user["nombre_completo"]
         for user in list_users(project_key="08-siif")
@@ -79,26 +113,16 @@ def create_app(config_name="default"):
         return normalized
 
     def _normalize_text(value):
-        text_value = str(value or "").strip().lower()
-        replacements = {
-            "á": "a",
-            "é": "e",
-            "í": "i",
-            "ó": "o",
-            "ú": "u",
-            "ü": "u",
-            "ñ": "n",
-        }
-        for source, target in replacements.items():
-            text_value = text_value.replace(source, target)
-        return re.sub(r"\s+", " ", text_value)
+        return " ".join(str(value or "").lower().translate(ACCENT_TRANSLATION).split())
+
+    digit_runs_re = re.compile(r"(\d+)")
 
     def _alphanumeric_sort_key(value):
         normalized = str(value or "").strip()
         if not normalized:
             return ((2, ""),)
 
-        parts = re.split(r"(\d+)", normalized.casefold())
+        parts = digit_runs_re.split(normalized.casefold())
         return tuple(
             (0, int(part)) if part.isdigit() else (1, part)
             for part in parts
@@ -207,8 +231,8 @@ def create_app(config_name="default"):
         ).first()
 
         total_registros = int(visible_totals[0] or 0)
-        visible_total_cargos = float(visible_totals[1] or 0)
-        visible_total_abonos = float(visible_totals[2] or 0)
+        visible_total_cargos = visible_totals[1] or 0
+        visible_total_abonos = visible_totals[2] or 0
 
         contable_query = query.filter(Transaccion.genero.in_(sorted(CONTABLE_GENEROS)))
         contable_totals = contable_query.with_entities(
@@ -218,8 +242,8 @@ def create_app(config_name="default"):
         ).first()
 
         total_registros_contables = int(contable_totals[0] or 0)
-        total_cargos = float(contable_totals[1] or 0)
-        total_abonos = float(contable_totals[2] or 0)
+        total_cargos = contable_totals[1] or 0
+        total_abonos = contable_totals[2] or 0
         diferencia = total_cargos - total_abonos
 
         return {
@@ -236,19 +260,20 @@ def create_app(config_name="default"):
         }
 
     def _build_visible_balance_payload(transaccion):
+        # Los montos ya llegan como float desde el tipo Centavos (None -> 0)
         genero = str(transaccion.genero or "").strip()
         if genero in CONTABLE_GENEROS:
             return {
-                "saldo_inicial": float(transaccion.saldo_inicial) if transaccion.saldo_inicial else 0,
-                "cargos": float(transaccion.cargos) if transaccion.cargos else 0,
-                "abonos": float(transaccion.abonos) if transaccion.abonos else 0,
-                "saldo_final": float(transaccion.saldo_final) if transaccion.saldo_final else 0,
+                "saldo_inicial": transaccion.saldo_inicial or 0,
+                "cargos": transaccion.cargos or 0,
+                "abonos": transaccion.abonos or 0,
+                "saldo_final": transaccion.saldo_final or 0,
             }
         return {
-            "saldo_inicial": float(transaccion.abonos) if transaccion.abonos else 0,
-            "cargos": float(transaccion.saldo_inicial) if transaccion.saldo_inicial else 0,
-            "abonos": float(transaccion.cargos) if transaccion.cargos else 0,
-            "saldo_final": float(transaccion.saldo_final) if transaccion.saldo_final else 0,
+            "saldo_inicial": transaccion.abonos or 0,
+            "cargos": transaccion.saldo_inicial or 0,
+            "abonos": transaccion.cargos or 0,
+            "saldo_final": transaccion.saldo_final or 0,
         }
 
     def _safe_next_url(raw_url):
@@ -284,6 +309,8 @@ def create_app(config_name="default"):
         current_username = (username or session.get("auth_user") or "").strip().lower()
         return current_username in limited_catalog_selection_users or current_username == "miguel"
 
+    ente_branch_re = re.compile(r"1\.(\d+)")
+
     def _catalog_item_is_visible_for_limited_selection(item):
         if str(item.get("grupo") or "").strip().lower() != "entes":
             return False
@@ -293,7 +320,7 @@ def create_app(config_name="default"):
         if num == "1":
             return True
 
-        branch_match = re.fullmatch(r"1\.(\d+)", num)
+        branch_match = ente_branch_re.fullmatch(num)
         if branch_match:
             return 1 <= int(branch_match.group(1)) <= 29
 
@@ -580,6 +607,8 @@ def create_app(config_name="default"):
             "ambito": str(item.get("ambito") or "").strip(),
         }
 
+    poder_ejecutivo_num_re = re.compile(r"1\.(?:[1-9]|1[0-6])")
+
     def _get_catalogo_consulta_detail(catalog_id):
         definition = catalogos_consulta_definitions.get(catalog_id)
         if not definition:
@@ -594,7 +623,7 @@ def create_app(config_name="default"):
                 _serialize_catalogo_consulta_ente(item)
                 for item in catalog_items
                 if item.get("num") == "1"
-                or re.fullmatch(r"1\.(?:[1-9]|1[0-6])", str(item.get("num") or ""))
+                or poder_ejecutivo_num_re.fullmatch(str(item.get("num") or ""))
             ]
         elif catalog_id == "opd_salud":
             entes_referencia = [
@@ -665,6 +694,16 @@ def create_app(config_name="default"):
     db.init_app(app)
     CORS(app)
 
+    def _insert_entes_ignorando_duplicados(payloads):
+        insert_fn = postgresql_insert if db.engine.dialect.name == "postgresql" else sqlite_insert
+        stmt = (
+            insert_fn(Ente)
+            .values(payloads)
+            .on_conflict_do_nothing(index_elements=["clave"])
+            .returning(Ente.id)
+        )
+        return db.session.execute(stmt).scalars().all()
+
     # Crear tablas con manejo de errores
     with app.app_context():
         try:
@@ -672,12 +711,7 @@ def create_app(config_name="default"):
             print("✓ Base de datos conectada")
 
             def _normalize_nombre(value):
-                s = str(value or "").strip().lower()
-                rep = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n"}
-                for k, v in rep.items():
-                    s = s.replace(k, v)
-                s = re.sub(r"\s+", " ", s)
-                return s
+                return " ".join(str(value or "").lower().translate(ACCENT_TRANSLATION).split())
 
             def _ensure_entes_dd_column():
                 inspector = inspect(db.engine)
@@ -720,6 +754,65 @@ def create_app(config_name="default"):
                     db.session.commit()
                     columns.add(column_name)
 
+            def _ensure_transacciones_amount_cents():
+                inspector = inspect(db.engine)
+                if "transacciones" not in inspector.get_table_names():
+                    return
+                amount_columns = ("saldo_inicial", "cargos", "abonos", "saldo_final")
+                column_types = {
+                    col["name"]: col["type"]
+                    for col in inspector.get_columns("transacciones")
+                }
+                pending_columns = [
+                    column_name
+                    for column_name in amount_columns
+                    if isinstance(column_types.get(column_name), Numeric)
+                ]
+                if not pending_columns:
+                    return
+
+                dialect_name = db.engine.dialect.name
+                if dialect_name == "postgresql":
+                    for column_name in pending_columns:
+                        db.session.execute(
+                            text(
+                                f"ALTER TABLE transacciones ALTER COLUMN {column_name} "
+                                f"TYPE BIGINT USING ROUND({column_name} * 100)::BIGINT"
+                            )
+                        )
+                    db.session.commit()
+                elif dialect_name == "sqlite":
+                    # SQLite no cambia el tipo declarado; user_version marca la conversión.
+                    centavos_version = 1
+                    version = db.session.execute(text("PRAGMA user_version")).scalar() or 0
+                    if version >= centavos_version:
+                        return
+                    assignments = ", ".join(
+                        f"{column_name} = CAST(ROUND({column_name} * 100) AS INTEGER)"
+                        for column_name in pending_columns
+                    )
+                    db.session.execute(text(f"UPDATE transacciones SET {assignments}"))
+                    db.session.execute(
+                        text(f"PRAGMA user_version = {centavos_version}")
+                    )
+                    db.session.commit()
+
+            def _ensure_transacciones_report_index():
+                # Índice del recorrido por llave (keyset) del reporte
+                inspector = inspect(db.engine)
+                if "transacciones" not in inspector.get_table_names():
+                    return
+                indexes = {index["name"] for index in inspector.get_indexes("transacciones")}
+                if "idx_fecha_cuenta_id" in indexes:
+                    return
+                db.session.execute(
+                    text(
+                        "CREATE INDEX idx_fecha_cuenta_id "
+                        "ON transacciones (fecha_transaccion, cuenta_contable, id)"
+                    )
+                )
+                db.session.commit()
+
             def _ensure_lotes_catalog_columns():
                 inspector = inspect(db.engine)
                 if "lotes_carga" not in inspector.get_table_names():
@@ -787,18 +880,8 @@ def create_app(config_name="default"):
                 if not pending_entes:
                     return
 
-                for payload in pending_entes:
-                    db.session.add(Ente(**payload))
-
-                try:
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
-                    for payload in pending_entes:
-                        if Ente.query.filter_by(clave=payload["clave"]).first():
-                            continue
-                        db.session.add(Ente(**payload))
-                    db.session.commit()
+                _insert_entes_ignorando_duplicados(pending_entes)
+                db.session.commit()
 
             def _seed_entes_dd():
                 dd_rules = [
@@ -908,19 +991,21 @@ def create_app(config_name="default"):
 
             def _sync_catalog_users():
                 project_usernames = set()
+                # Una sola consulta de usuarios en lugar de una por usuario del catálogo
+                existing_users = Usuario.query.order_by(Usuario.id).all()
+                users_by_username = {}
+                for existing_user in existing_users:
+                    users_by_username.setdefault((existing_user.username or "").lower(), existing_user)
+
                 for catalog_user in list_users(project_key="08-siif"):
                     username = str(catalog_user.get("usuario") or "").strip().lower()
                     if not username:
                         continue
 
                     project_usernames.add(username)
-                    user = (
-                        Usuario.query
-                        .filter(func.lower(Usuario.username) == username)
-                        .first()
-                    )
+                    user = users_by_username.get(username)
                     if user is None:
-                        user = Usuario(username=username)
+                        user = users_by_username[username] = Usuario(username=username)
 
                     user.nombre_completo = (
                         str(catalog_user.get("nombre_completo") or username).strip()
@@ -932,8 +1017,8 @@ def create_app(config_name="default"):
                     user.activo = bool(catalog_user.get("activo", True))
                     db.session.add(user)
 
-                # Deactivate users not in this project
-                for extra_user in Usuario.query.all():
+                # Deactivate users not in this project (new users always belong to it)
+                for extra_user in existing_users:
                     if (extra_user.username or "").strip().lower() not in project_usernames:
                         extra_user.activo = False
                         db.session.add(extra_user)
@@ -943,18 +1028,40 @@ def create_app(config_name="default"):
             _ensure_entes_dd_column()
             _ensure_lotes_tipo_archivo_column()
             _ensure_transacciones_catalog_columns()
+            _ensure_transacciones_amount_cents()
+            _ensure_transacciones_report_index()
             _ensure_lotes_catalog_columns()
             _seed_entes_catalogo()
             _sync_catalog_users()
             _seed_entes_dd()
+            # Con gunicorn --preload la app se crea antes del fork; cerrar el pool
+            # evita que los workers compartan conexiones heredadas.
+            db.engine.dispose()
         except Exception as e:
             print(f"❌ Error al conectar con la base de datos: {str(e)}")
             print(f"   Verifica: DATABASE_URL en .env")
             raise
 
-    # Jobs para tracking de progreso
+    # Jobs para tracking de progreso. Cada entrada es un JobSnapshot inmutable:
+    # los lectores (SSE / polling) no toman el lock, solo los escritores.
+    # Cada job tiene su Condition: el SSE local espera en ella en lugar de sondear.
     jobs = {}
     jobs_lock = threading.Lock()
+    job_conditions = {}
+    app.extensions["job_conditions"] = job_conditions
+    job_state_ttl = 24 * 60 * 60
+
+    # Con REDIS_URL el estado vive en Redis (job:<id>) y cada cambio se publica en
+    # el canal del mismo nombre: cualquier worker sirve el SSE de cualquier carga.
+    job_redis = None
+    if app.config.get("REDIS_URL"):
+        if redis is None:
+            app.logger.warning("[jobs] REDIS_URL configurado pero el paquete redis no está instalado")
+        else:
+            job_redis = redis.Redis.from_url(app.config["REDIS_URL"], decode_responses=True)
+
+    def _job_channel(job_id):
+        return f"job:{job_id}"
 
     def _job_snapshot_dir():
         configured_dir = app.config.get("JOB_STATUS_DIR")
@@ -973,6 +1080,8 @@ def create_app(config_name="default"):
     def _serialize_job(job):
         if not job:
             return None
+        if isinstance(job, JobSnapshot):
+            return asdict(job)
         return {
             "progress": job.get("progress", 0),
             "message": job.get("message", ""),
@@ -989,6 +1098,19 @@ def create_app(config_name="default"):
             return
 
         payload["updated_at"] = time.time()
+        if job_redis is not None:
+            message = json.dumps(payload, ensure_ascii=False)
+            try:
+                pipe = job_redis.pipeline()
+                pipe.set(_job_channel(job_id), message, ex=job_state_ttl)
+                pipe.publish(_job_channel(job_id), message)
+                pipe.execute()
+                return
+            except redis.RedisError as exc:
+                app.logger.warning(
+                    "[jobs] No se pudo publicar en Redis el estado de %s: %s", job_id, exc
+                )
+
         target = _job_snapshot_path(job_id)
         temp_name = f".{target.name}.{uuid.uuid4().hex}.tmp"
         temp_path = target.with_name(temp_name)
@@ -1009,6 +1131,17 @@ def create_app(config_name="default"):
                 pass
 
     def _read_job_snapshot(job_id):
+        if job_redis is not None:
+            try:
+                message = job_redis.get(_job_channel(job_id))
+            except redis.RedisError as exc:
+                app.logger.warning(
+                    "[jobs] No se pudo leer de Redis el estado de %s: %s", job_id, exc
+                )
+            else:
+                if message is not None:
+                    return _serialize_job(json.loads(message))
+
         target = _job_snapshot_path(job_id)
         if not target.exists():
             return None
@@ -1023,11 +1156,19 @@ def create_app(config_name="default"):
 
         return _serialize_job(payload)
 
+    def _notify_job(job_id):
+        condition = job_conditions.get(job_id)
+        if condition is not None:
+            with condition:
+                condition.notify_all()
+
     def _register_job(job_id, payload):
-        snapshot = dict(payload)
+        snapshot = JobSnapshot(**payload)
         with jobs_lock:
             jobs[job_id] = snapshot
+            job_conditions.setdefault(job_id, threading.Condition())
         _write_job_snapshot(job_id, snapshot)
+        _notify_job(job_id)
         return snapshot
 
     def _update_job(job_id, **changes):
@@ -1035,16 +1176,22 @@ def create_app(config_name="default"):
             job = jobs.get(job_id)
             if job is None:
                 return None
-            job.update(changes)
-            snapshot = dict(job)
+            snapshot = replace(job, **changes)
+            jobs[job_id] = snapshot
+            if snapshot.done:
+                # Ya no habrá más cambios: se notifica por última vez a los que
+                # esperan y los SSE nuevos leen el snapshot final sin Condition.
+                condition = job_conditions.pop(job_id, None)
+            else:
+                condition = job_conditions.get(job_id)
         _write_job_snapshot(job_id, snapshot)
+        if condition is not None:
+            with condition:
+                condition.notify_all()
         return snapshot
 
     def _get_job_snapshot(job_id):
-        with jobs_lock:
-            job = jobs.get(job_id)
-            snapshot = dict(job) if job is not None else None
-
+        snapshot = jobs.get(job_id)
         if snapshot is not None:
             return _serialize_job(snapshot)
         return _read_job_snapshot(job_id)
@@ -1054,19 +1201,50 @@ def create_app(config_name="default"):
         "dashboard": {"ts": 0, "data": None},
     }
     stats_cache_lock = threading.Lock()
+    stats_cache_generation = [0]
 
     def _invalidate_stats_cache():
         with stats_cache_lock:
+            stats_cache_generation[0] += 1
             for key in list(stats_cache.keys()):
                 stats_cache[key]["ts"] = 0
                 stats_cache[key]["data"] = None
 
-    def _get_cached_stats(key, ttl, compute_fn):
+    def _refresh_cached_stats(key, compute_fn, generation):
+        try:
+            with app.app_context():
+                data = compute_fn()
+        except Exception as exc:
+            app.logger.warning("No se pudieron refrescar las estadísticas %s: %s", key, exc)
+            data = None
+
+        with stats_cache_lock:
+            cached = stats_cache.get(key)
+            if cached is not None:
+                cached["refreshing"] = False
+            # Una carga nueva invalidó el caché mientras se calculaba; se descarta.
+            if data is None or generation != stats_cache_generation[0]:
+                return
+            stats_cache[key] = {"ts": time.time(), "data": data}
+
+    def _get_cached_stats(key, ttl, compute_fn, refresh_in_background=False):
+        # Con refresh_in_background los datos vencidos se sirven mientras un hilo
+        # los recalcula fuera del request.
         now = time.time()
         with stats_cache_lock:
             cached = stats_cache.get(key)
-            if cached and cached["data"] is not None and (now - cached["ts"]) < ttl:
-                return cached["data"]
+            if cached and cached["data"] is not None:
+                if (now - cached["ts"]) < ttl:
+                    return cached["data"]
+                if refresh_in_background:
+                    if not cached.get("refreshing"):
+                        cached["refreshing"] = True
+                        threading.Thread(
+                            target=_refresh_cached_stats,
+                            args=(key, compute_fn, stats_cache_generation[0]),
+                            daemon=True,
+                        ).start()
+                    return cached["data"]
 
         data = compute_fn()
         with stats_cache_lock:
@@ -1326,17 +1504,33 @@ def create_app(config_name="default"):
         except (TypeError, ValueError):
             return None
 
+    def _build_prefix_range_expression(column, value):
+        # Las columnas con búsqueda por prefijo guardan claves en mayúsculas;
+        # el rango [valor, sucesor) usa el índice btree sin LIKE ni comodines.
+        value = value.upper()
+        if not value:
+            return column.isnot(None)
+        last_code = ord(value[-1])
+        if last_code >= 0x10FFFF:
+            return column.startswith(value, autoescape=True)
+        upper_bound = value[:-1] + chr(last_code + 1)
+        return and_(column >= value, column < upper_bound)
+
     def _build_string_match_expression(column, value, match_mode):
         if match_mode == "exact":
             return column == value
         if match_mode == "prefix":
-            return column.like(f"{value}%")
-        return column.like(f"%{value}%")
+            return _build_prefix_range_expression(column, value)
+        return column.contains(value, autoescape=True)
 
     def _apply_string_match(query, column, value, match_mode):
         return query.filter(_build_string_match_expression(column, value, match_mode))
 
-    def _apply_transaccion_filters(query, filters, exclude_field=None):
+    def _build_transaccion_filter_clauses(filters, exclude_field=None):
+        # Se arma la lista completa de condiciones y se aplica con un solo filter():
+        # un único WHERE por combinación de filtros, que el caché de compilación
+        # de SQLAlchemy reutiliza entre peticiones (los valores van como parámetros).
+        clauses = []
         for key, value in (filters or {}).items():
             if key == exclude_field:
                 continue
@@ -1350,9 +1544,9 @@ def create_app(config_name="default"):
                 if not parsed_date:
                     continue
                 if config["op"] == "gte":
-                    query = query.filter(config["column"] >= parsed_date)
+                    clauses.append(config["column"] >= parsed_date)
                 elif config["op"] == "lte":
-                    query = query.filter(config["column"] <= parsed_date)
+                    clauses.append(config["column"] <= parsed_date)
                 continue
 
             values = _get_filter_values(filters, key)
@@ -1374,9 +1568,9 @@ def create_app(config_name="default"):
 
                 column_expr = func.upper(func.coalesce(Transaccion.ente_siglas_catalogo, ""))
                 if len(selected_siglas) == 1:
-                    query = query.filter(column_expr == selected_siglas[0])
+                    clauses.append(column_expr == selected_siglas[0])
                 else:
-                    query = query.filter(column_expr.in_(selected_siglas))
+                    clauses.append(column_expr.in_(selected_siglas))
                 continue
 
             if key == "dependencia":
@@ -1394,16 +1588,16 @@ def create_app(config_name="default"):
 
                 column_expr = func.upper(func.coalesce(Transaccion.dependencia, ""))
                 if len(selected_codes) == 1:
-                    query = query.filter(column_expr == selected_codes[0])
+                    clauses.append(column_expr == selected_codes[0])
                 else:
-                    query = query.filter(column_expr.in_(selected_codes))
+                    clauses.append(column_expr.in_(selected_codes))
                 continue
 
             if len(values) == 1:
-                query = _apply_string_match(query, config["column"], values[0], config["match"])
+                clauses.append(_build_string_match_expression(config["column"], values[0], config["match"]))
                 continue
 
-            query = query.filter(
+            clauses.append(
                 or_(
                     *[
                         _build_string_match_expression(config["column"], item, config["match"])
@@ -1412,7 +1606,11 @@ def create_app(config_name="default"):
                 )
             )
 
-        return query
+        return clauses
+
+    def _apply_transaccion_filters(query, filters, exclude_field=None):
+        clauses = _build_transaccion_filter_clauses(filters, exclude_field=exclude_field)
+        return query.filter(*clauses) if clauses else query
 
     def _build_filter_options(field_key, filters, search_term="", limit=None, base_query=None):
         config = TRANSACTION_FILTERS.get(field_key)
@@ -1789,6 +1987,15 @@ def create_app(config_name="default"):
 
     # ==================== API DE CARGA ====================
 
+    def _release_input_files(files, staged_paths=()):
+        for _, content in files:
+            content.close()
+        for path in staged_paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
     @app.route("/api/process", methods=["POST"])
     def process():
         try:
@@ -1868,11 +2075,22 @@ def create_app(config_name="default"):
                     payload["current_file"] = current_file
                 _update_job(job_id, **payload)
 
+            # Cada archivo se guarda en disco y se mapea; el hilo de proceso lo
+            # libera al terminar.
+            staging_dir = Path(app.config.get("UPLOAD_FOLDER", "/tmp/sipac_uploads")) / "pendientes"
+            staging_dir.mkdir(parents=True, exist_ok=True)
+            staged_paths = []
             files_in_memory = []
-            for f in files_to_process:
-                f.seek(0)
-                content = io.BytesIO(f.read())
-                files_in_memory.append((f.filename, content))
+            try:
+                for f in files_to_process:
+                    staged_path = staging_dir / f"{uuid.uuid4().hex}{Path(f.filename).suffix.lower()}"
+                    f.seek(0)
+                    f.save(staged_path)
+                    staged_paths.append(staged_path)
+                    files_in_memory.append((f.filename, _map_input_file(staged_path)))
+            except Exception:
+                _release_input_files(files_in_memory, staged_paths)
+                raise
 
             def process_files():
                 try:
@@ -1886,6 +2104,8 @@ def create_app(config_name="default"):
                             selected_ente_siglas=selected_catalog_item.get("siglas"),
                             selected_ente_nombre=selected_catalog_item.get("nombre"),
                             selected_ente_grupo=selected_catalog_item.get("grupo"),
+                            max_workers=app.config.get("MAX_WORKERS"),
+                            copy_workers=app.config.get("COPY_WORKERS"),
                         )
 
                         _update_job(
@@ -1900,6 +2120,8 @@ def create_app(config_name="default"):
 
                 except Exception as e:
                     _update_job(job_id, error=str(e), done=True)
+                finally:
+                    _release_input_files(files_in_memory, staged_paths)
 
             thread = threading.Thread(target=process_files)
             thread.daemon = True
@@ -1965,10 +2187,7 @@ def create_app(config_name="default"):
             if not files_to_process:
                 return jsonify({"message": "No hay archivos pendientes por cargar"}), 200
 
-            files_in_memory = []
-            for path in files_to_process:
-                with path.open("rb") as handle:
-                    files_in_memory.append((path.name, io.BytesIO(handle.read())))
+            files_in_memory = [(path.name, _map_input_file(path)) for path in files_to_process]
 
             job_id = str(uuid.uuid4())
             _register_job(
@@ -1997,7 +2216,11 @@ def create_app(config_name="default"):
                 try:
                     with app.app_context():
                         lote_id, total = process_files_to_database(
-                            files_in_memory, usuario, progress_callback
+                            files_in_memory,
+                            usuario,
+                            progress_callback,
+                            max_workers=app.config.get("MAX_WORKERS"),
+                            copy_workers=app.config.get("COPY_WORKERS"),
                         )
 
                         _update_job(
@@ -2011,6 +2234,8 @@ def create_app(config_name="default"):
 
                 except Exception as e:
                     _update_job(job_id, error=str(e), done=True)
+                finally:
+                    _release_input_files(files_in_memory)
 
             thread = threading.Thread(target=process_files)
             thread.daemon = True
@@ -2026,6 +2251,47 @@ def create_app(config_name="default"):
 
     # ==================== STREAM DE PROGRESO ====================
 
+    def _poll_job_updates(job_id):
+        while True:
+            job = _get_job_snapshot(job_id)
+            yield job
+            time.sleep(0.2 if job else 0.1)
+
+    def _wait_job_updates(job_id, wait_seconds=1.0):
+        # Job de este proceso: se espera en su Condition y solo se produce algo
+        # cuando cambia el snapshot (None al vencer wait_seconds). Un job ya
+        # terminado (o de otro proceso) no tiene Condition: se lee sondeando.
+        condition = job_conditions.get(job_id)
+        if condition is None:
+            yield from _poll_job_updates(job_id)
+            return
+
+        last_snapshot = None
+        while True:
+            with condition:
+                condition.wait_for(
+                    lambda: jobs.get(job_id) is not last_snapshot, timeout=wait_seconds
+                )
+                snapshot = jobs.get(job_id)
+            if snapshot is last_snapshot:
+                yield None
+                continue
+            last_snapshot = snapshot
+            yield _serialize_job(snapshot)
+
+    def _subscribe_job_updates(job_id, wait_seconds=1.0):
+        # Se suscribe antes de leer el estado actual para no perder eventos;
+        # produce None cuando no llega nada en wait_seconds (revisión del timeout).
+        pubsub = job_redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(_job_channel(job_id))
+            yield _get_job_snapshot(job_id)
+            while True:
+                message = pubsub.get_message(timeout=wait_seconds)
+                yield _serialize_job(json.loads(message["data"])) if message else None
+        finally:
+            pubsub.close()
+
     @app.route("/api/progress/<job_id>")
     def progress_stream(job_id):
         if request.args.get("format") == "json":
@@ -2037,44 +2303,55 @@ def create_app(config_name="default"):
         def generate():
             last_progress = -1
             max_wait = 300
+            heartbeat_interval = 15
             start_time = time.time()
+            last_sent = start_time
+            if job_redis is not None:
+                updates = _subscribe_job_updates(job_id)
+            else:
+                updates = _wait_job_updates(job_id)
 
-            while True:
-                if time.time() - start_time > max_wait:
-                    yield f"data: {json.dumps({'progress': 100, 'message': 'Timeout', 'done': True})}\n\n"
-                    break
-
-                job = _get_job_snapshot(job_id)
-
-                if not job:
-                    time.sleep(0.1)
-                    continue
-
-                current_progress = job["progress"]
-                message = job["message"]
-                done = job["done"]
-                error = job["error"]
-                current_file = job["current_file"]
-                lote_id = job["lote_id"]
-                total_registros = job["total_registros"]
-
-                if current_progress != last_progress or done or error:
-                    data = {
-                        "progress": current_progress,
-                        "message": message,
-                        "done": done,
-                        "error": error,
-                        "current_file": current_file,
-                        "lote_id": lote_id,
-                        "total_registros": total_registros,
-                    }
-                    yield f"data: {json.dumps(data)}\n\n"
-                    last_progress = current_progress
-
-                if done or error:
-                    break
+            try:
+                for job in updates:
+                    now = time.time()
+                    if now - start_time > max_wait:
+                        yield f"data: {json.dumps({'progress': 100, 'message': 'Timeout', 'done': True})}\n\n"
+                        break
+
+                    # Comentario SSE para que proxies no corten la conexión inactiva.
+                    if now - last_sent >= heartbeat_interval:
+                        yield ":\n\n"
+                        last_sent = now
+
+                    if not job:
+                        continue
 
-                time.sleep(0.2)
+                    current_progress = job["progress"]
+                    message = job["message"]
+                    done = job["done"]
+                    error = job["error"]
+                    current_file = job["current_file"]
+                    lote_id = job["lote_id"]
+                    total_registros = job["total_registros"]
+
+                    if current_progress != last_progress or done or error:
+                        data = {
+                            "progress": current_progress,
+                            "message": message,
+                            "done": done,
+                            "error": error,
+                            "current_file": current_file,
+                            "lote_id": lote_id,
+                            "total_registros": total_registros,
+                        }
+                        yield f"data: {json.dumps(data)}\n\n"
+                        last_progress = current_progress
+                        last_sent = now
+
+                    if done or error:
+                        break
+            finally:
+                updates.close()
 
         return Response(generate(), mimetype="text/event-stream")
 
@@ -2149,35 +2426,47 @@ def create_app(config_name="default"):
             )
             filtros = _sanitize_transaccion_filters(request.args)
             base_query = _apply_transaccion_filters(_user_transaccion_base_query(), filtros)
-            query = base_query.order_by(Transaccion.fecha_transaccion.desc())
+            # Solo lectura: filas de columnas (Row) en lugar de instancias del ORM
+            query = base_query.with_entities(*Transaccion.__table__.columns).order_by(
+                Transaccion.fecha_transaccion.desc()
+            )
             paginated = query.paginate(page=page, per_page=per_page, error_out=False)
             ente_catalogo_lookup = _get_ente_catalog_lookup()
 
-            response_payload = {
-                "transacciones": [
-                    {
-                        **t.to_dict(),
-                        **_build_visible_balance_payload(t),
-                        "ente": ente_catalogo_lookup.get(
-                            _normalize_catalog_sigla(t.ente_siglas_catalogo),
-                            t.ente_siglas_catalogo or "",
-                        ),
-                        "ente_catalogo": ente_catalogo_lookup.get(
-                            _normalize_catalog_sigla(t.ente_siglas_catalogo),
-                            t.ente_siglas_catalogo or "",
-                        ),
-                    }
-                    for t in paginated.items
-                ],
+            def _serialize_transaccion(t):
+                ente = ente_catalogo_lookup.get(
+                    _normalize_catalog_sigla(t.ente_siglas_catalogo),
+                    t.ente_siglas_catalogo or "",
+                )
+                return {
+                    **Transaccion.row_to_dict(t),
+                    **_build_visible_balance_payload(t),
+                    "ente": ente,
+                    "ente_catalogo": ente,
+                }
+
+            tail_payload = {
                 "total": paginated.total,
                 "pages": paginated.pages,
                 "page": page,
             }
 
             if include_totals:
-                response_payload.update(_build_balance_metrics(base_query))
-
-            return jsonify(response_payload)
+                tail_payload.update(_build_balance_metrics(base_query))
+
+            def generate():
+                # Se serializa fila por fila para no duplicar la página en memoria,
+                # con el proveedor JSON de la app (separadores compactos y
+                # conversión de fechas/Decimal), igual que jsonify.
+                dumps = current_app.json.dumps
+                yield '{"transacciones":['
+                for index, t in enumerate(paginated.items):
+                    row_json = dumps(_serialize_transaccion(t))
+                    yield f",{row_json}" if index else row_json
+                yield "],"
+                yield dumps(tail_payload)[1:]
+
+            return Response(stream_with_context(generate()), mimetype="application/json")
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -2248,55 +2537,187 @@ def create_app(config_name="default"):
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    report_text_columns = [
+        ('cuenta_contable', 'Cuenta Contable'),
+        ('genero', 'Genero'),
+        ('grupo', 'Grupo'),
+        ('rubro', 'Rubro'),
+        ('cuenta', 'Cuenta'),
+        ('subcuenta', 'Subcuenta'),
+        ('dependencia', 'Dependencia'),
+        ('unidad_responsable', 'Unidad Responsable'),
+        ('centro_costo', 'Centro de Costo'),
+        ('proyecto_presupuestario', 'Proyecto Presupuestario'),
+        ('fuente', 'Fuente'),
+        ('subfuente', 'SubFuente'),
+        ('tipo_recurso', 'Tipo de Recurso'),
+        ('partida_presupuestal', 'Partida Presupuestal'),
+        ('nombre_cuenta', 'Nombre de la Cuenta'),
+    ]
+    report_detail_columns = [
+        ('poliza', 'POLIZA'),
+        ('beneficiario', 'BENEFICIARIO'),
+        ('descripcion', 'DESCRIPCION'),
+        ('orden_pago', 'O.P.'),
+    ]
+
+    # Rotación de montos de _build_visible_balance_payload resuelta en el SELECT;
+    # los montos pasan por el tipo Centavos y llegan como float.
+    report_contable = Transaccion.genero.in_(sorted(CONTABLE_GENEROS))
+
+    def _report_amount(column):
+        return func.coalesce(column, 0)
+
+    report_columns = (
+        [(label, getattr(Transaccion, column)) for column, label in report_text_columns]
+        + [('FECHA', Transaccion.fecha_transaccion)]
+        + [(label, getattr(Transaccion, column)) for column, label in report_detail_columns]
+        + [
+            ('SALDO INICIAL', case(
+                (report_contable, _report_amount(Transaccion.saldo_inicial)),
+                else_=_report_amount(Transaccion.abonos),
+            )),
+            ('CARGOS', case(
+                (report_contable, _report_amount(Transaccion.cargos)),
+                else_=_report_amount(Transaccion.saldo_inicial),
+            )),
+            ('ABONOS', case(
+                (report_contable, _report_amount(Transaccion.abonos)),
+                else_=_report_amount(Transaccion.cargos),
+            )),
+            ('SALDO FINAL', _report_amount(Transaccion.saldo_final)),
+        ]
+    )
+    report_headers = [label for label, _ in report_columns]
+    report_fecha_index = report_headers.index('FECHA')
+    report_cuenta_index = report_headers.index('Cuenta Contable')
+
+    def _write_report_workbook(output, sheet_name, columns, rows):
+        # Escritura por filas en modo streaming: xlsxwriter (constant_memory) si
+        # está instalado; si no, openpyxl en modo write_only.
+        columns = [str(column) for column in columns]
+
+        if xlsxwriter is not None:
+            workbook = xlsxwriter.Workbook(
+                output,
+                {"constant_memory": True, "strings_to_urls": False},
+            )
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, columns, workbook.add_format({"bold": True}))
+            for row_idx, row in enumerate(rows, start=1):
+                worksheet.write_row(row_idx, 0, row)
+            workbook.close()
+            return
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(sheet_name)
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(worksheet, value=column)
+            cell.font = Font(bold=True)
+            header.append(cell)
+        worksheet.append(header)
+        for row in rows:
+            worksheet.append(row)
+        workbook.save(output)
+
+    report_max_rows = 100000
+    report_page_size = 5000
+    report_order_columns = (
+        Transaccion.fecha_transaccion,
+        Transaccion.cuenta_contable,
+        Transaccion.id,
+    )
+
+    def _parse_report_key(value):
+        # [fecha 'YYYY-MM-DD', cuenta_contable, id] de la última fila ya entregada
+        if value in (None, "", []):
+            return None
+        if not isinstance(value, (list, tuple)) or len(value) != 3:
+            raise ValueError("last_seen_key debe ser [fecha, cuenta_contable, id]")
+        fecha = _parse_filter_date(value[0])
+        if fecha is None:
+            raise ValueError("last_seen_key: fecha inválida (YYYY-MM-DD)")
+        try:
+            row_id = int(value[2])
+        except (TypeError, ValueError):
+            raise ValueError("last_seen_key: id inválido")
+        return fecha, str(value[1] or ""), row_id
+
+    def _iter_report_rows(clauses, last_seen_key, state):
+        # Paginación por llave sobre (fecha, cuenta, id): cada página continúa
+        # después de la última fila leída, sin OFFSET, usando idx_fecha_cuenta_id.
+        # Las filas del cursor van directo al libro, sin pasar por DataFrames.
+        fecha_labels = {}
+        remaining = report_max_rows
+        while True:
+            page_limit = min(report_page_size, remaining)
+            stmt = select(*[expr for _, expr in report_columns], Transaccion.id).where(*clauses)
+            if last_seen_key is not None:
+                stmt = stmt.where(tuple_(*report_order_columns) > tuple_(*last_seen_key))
+            stmt = stmt.order_by(*report_order_columns).limit(page_limit)
+
+            page = db.session.execute(stmt).all()
+            for row in page:
+                values = list(row[:-1])
+                fecha = values[report_fecha_index]
+                etiqueta = fecha_labels.get(fecha)
+                if etiqueta is None:
+                    # strftime una sola vez por fecha distinta
+                    etiqueta = fecha_labels[fecha] = fecha.strftime('%d/%m/%Y') if fecha else ''
+                values[report_fecha_index] = etiqueta
+                yield values
+
+            remaining -= len(page)
+            if len(page) < page_limit:
+                return
+            last = page[-1]
+            last_seen_key = (last[report_fecha_index], last[report_cuenta_index], last[-1])
+            if remaining <= 0:
+                # Tope alcanzado: la llave permite pedir la siguiente parte
+                state["siguiente"] = [
+                    last_seen_key[0].isoformat(),
+                    last_seen_key[1],
+                    last_seen_key[2],
+                ]
+                return
+
     @app.route("/api/reportes/generar", methods=["POST"])
     def generar_reporte():
         try:
-            filtros = _sanitize_transaccion_filters(request.json or {})
-            query = _apply_transaccion_filters(_user_transaccion_base_query(), filtros)
-
-            query = query.order_by(Transaccion.fecha_transaccion, Transaccion.cuenta_contable)
-            transacciones = query.limit(100000).all()
-
-            # Crear Excel
-            output = io.BytesIO()
-            df = pd.DataFrame([{
-                'Cuenta Contable': t.cuenta_contable,
-                'Genero': t.genero,
-                'Grupo': t.grupo,
-                'Rubro': t.rubro,
-                'Cuenta': t.cuenta,
-                'Subcuenta': t.subcuenta,
-                'Dependencia': t.dependencia,
-                'Unidad Responsable': t.unidad_responsable,
-                'Centro de Costo': t.centro_costo,
-                'Proyecto Presupuestario': t.proyecto_presupuestario,
-                'Fuente': t.fuente,
-                'SubFuente': t.subfuente,
-                'Tipo de Recurso': t.tipo_recurso,
-                'Partida Presupuestal': t.partida_presupuestal,
-                'Nombre de la Cuenta': t.nombre_cuenta,
-                'FECHA': t.fecha_transaccion.strftime('%d/%m/%Y') if t.fecha_transaccion else '',
-                'POLIZA': t.poliza,
-                'BENEFICIARIO': t.beneficiario,
-                'DESCRIPCION': t.descripcion,
-                'O.P.': t.orden_pago,
-                **{
-                    'SALDO INICIAL': _build_visible_balance_payload(t)["saldo_inicial"],
-                    'CARGOS': _build_visible_balance_payload(t)["cargos"],
-                    'ABONOS': _build_visible_balance_payload(t)["abonos"],
-                    'SALDO FINAL': _build_visible_balance_payload(t)["saldo_final"],
-                },
-            } for t in transacciones])
-
-            df.to_excel(output, index=False, sheet_name='Reporte')
+            payload = request.json or {}
+            filtros = _sanitize_transaccion_filters(payload)
+            try:
+                last_seen_key = _parse_report_key(payload.get("last_seen_key"))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            clauses = _build_transaccion_filter_clauses(filtros)
+            permisos = _user_transaccion_base_query().whereclause
+            if permisos is not None:
+                clauses.insert(0, permisos)
+
+            # Las páginas se escriben al libro conforme se leen; el archivo se arma
+            # en un temporal en disco en lugar de en memoria.
+            state = {"siguiente": None}
+            output = tempfile.TemporaryFile()
+            _write_report_workbook(
+                output,
+                'Reporte',
+                report_headers,
+                _iter_report_rows(clauses, last_seen_key, state),
+            )
             output.seek(0)
 
-            return send_file(
+            response = send_file(
                 output,
                 mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 as_attachment=True,
                 download_name=f'reporte_sipac_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
             )
+            if state["siguiente"] is not None:
+                response.headers["X-Reporte-Siguiente"] = json.dumps(state["siguiente"], ensure_ascii=False)
+            return response
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -2307,7 +2728,9 @@ def create_app(config_name="default"):
             user_query = _user_transaccion_base_query()
 
             def compute_dashboard():
-                stats = user_query.with_entities(
+                # Puede ejecutarse en un hilo de refresco: usar la sesión actual.
+                query = user_query.with_session(db.session())
+                stats = query.with_entities(
                     func.count(Transaccion.id),
                     func.count(func.distinct(Transaccion.cuenta_contable)),
                     func.count(func.distinct(Transaccion.dependencia)),
@@ -2318,15 +2741,15 @@ def create_app(config_name="default"):
                 total_transacciones = int(stats[0] or 0)
                 total_cuentas = int(stats[1] or 0)
                 total_dependencias = int(stats[2] or 0)
-                suma_cargos = float(stats[3] or 0)
-                suma_abonos = float(stats[4] or 0)
+                suma_cargos = stats[3] or 0
+                suma_abonos = stats[4] or 0
 
                 ultimos_lotes = (
                     LoteCarga.query.order_by(LoteCarga.fecha_carga.desc()).limit(5).all()
                 )
 
                 transacciones_mes = (
-                    user_query.with_entities(
+                    query.with_entities(
                         func.date_trunc("month", Transaccion.fecha_transaccion).label("mes"),
                         func.count(Transaccion.id).label("total"),
                     )
@@ -2348,7 +2771,12 @@ def create_app(config_name="default"):
                     ],
                 }
 
-            payload = _get_cached_stats(f"dashboard_{username}", 30, compute_dashboard)
+            payload = _get_cached_stats(
+                f"dashboard_{username}",
+                30,
+                compute_dashboard,
+                refresh_in_background=True,
+            )
             return jsonify(payload)
         except Exception as e:
             print(f"❌ Error en dashboard/stats: {str(e)}")
@@ -2412,6 +2840,44 @@ def create_app(config_name="default"):
             db.session.rollback()
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/entes/bulk", methods=["POST"])
+    def create_entes_bulk():
+        try:
+            data = request.json
+            if not isinstance(data, list):
+                return jsonify({"error": "Se esperaba una lista de entes"}), 400
+
+            payloads = []
+            for index, item in enumerate(data):
+                if not isinstance(item, dict) or not all(
+                    item.get(field) for field in ("clave", "codigo", "nombre")
+                ):
+                    return jsonify({
+                        "error": f"El ente en la posición {index} requiere clave, codigo y nombre"
+                    }), 400
+                payloads.append({
+                    "clave": item["clave"],
+                    "codigo": item["codigo"],
+                    "dd": item.get("dd", ""),
+                    "nombre": item["nombre"],
+                    "siglas": item.get("siglas", ""),
+                    "tipo": item.get("tipo", ""),
+                    "ambito": item.get("ambito", "ESTATAL"),
+                })
+
+            ids = _insert_entes_ignorando_duplicados(payloads) if payloads else []
+            db.session.commit()
+
+            return jsonify({
+                "success": True,
+                "insertados": len(ids),
+                "omitidos": len(payloads) - len(ids),
+                "ids": ids,
+            }), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
     @app.route("/api/entes/<int:ente_id>", methods=["PUT"])
     def update_ente(ente_id):
         try:
@@ -2482,40 +2948,51 @@ def create_app(config_name="default"):
 
     # ==================== ERRORES ====================
 
+    # Cuerpos JSON de error serializados una sola vez
+    error_bodies = {
+        413: json.dumps(
+            {"error": "El archivo es demasiado grande. Máximo 500 MB"}, ensure_ascii=False
+        ).encode("utf-8"),
+        404: json.dumps({"error": NotFound.description}, ensure_ascii=False).encode("utf-8"),
+        405: json.dumps(
+            {"error": "Método no permitido", "detalle": MethodNotAllowed.description},
+            ensure_ascii=False,
+        ).encode("utf-8"),
+        500: json.dumps(
+            {"error": "Error interno del servidor", "detalle": "Contacte al administrador"},
+            ensure_ascii=False,
+        ).encode("utf-8"),
+    }
+
+    def _cached_error_response(status_code):
+        return Response(error_bodies[status_code], status=status_code, mimetype="application/json")
+
     @app.errorhandler(413)
     def too_large(e):
-        return jsonify({"error": "El archivo es demasiado grande. Máximo 500 MB"}), 413
+        return _cached_error_response(413)
 
     @app.errorhandler(404)
     def not_found(e):
-        return (
-            jsonify(
-                {
-                    "error": str(e.description)
-                    if hasattr(e, "description")
-                    else "No encontrado"
-                }
-            ),
-            404,
-        )
+        description = getattr(e, "description", None)
+        if description in (None, NotFound.description):
+            return _cached_error_response(404)
+        return jsonify({"error": str(description)}), 404
 
     @app.errorhandler(405)
     def method_not_allowed(e):
+        description = getattr(e, "description", None)
+        if description in (None, MethodNotAllowed.description):
+            return _cached_error_response(405)
         return (
-            jsonify(
-                {
-                    "error": "Método no permitido",
-                    "detalle": str(e.description)
-                    if hasattr(e, "description")
-                    else "Método no permitido",
-                }
-            ),
+            jsonify({"error": "Método no permitido", "detalle": str(description)}),
             405,
         )
 
     @app.errorhandler(500)
     def internal_error(e):
         print(f"❌ Error 500: {str(e)}")
+        if not app.debug:
+            return _cached_error_response(500)
         return (
             jsonify({"error": "Error interno del servidor", "detalle": str(e)}),
             500,
@@ -25,7 +25,10 @@ class Config:
     PERMANENT_SESSION_LIFETIME = timedelta(hours=8)
     
     # Procesamiento
-    MAX_WORKERS = 4
+    # Opcional: estado de trabajos compartido entre workers (requiere paquete redis)
+    REDIS_URL = os.environ.get('REDIS_URL')
+    MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 4))  # Lectores de Excel en paralelo por carga
+    COPY_WORKERS = int(os.environ.get('COPY_WORKERS', 1))  # Conexiones para COPY en PostgreSQL (>1 copia en paralelo a una tabla de paso)
     CHUNK_SIZE = 1000  # Registros por lote para inserción
     
     # Paginación
@@ -8,9 +8,13 @@ The data was loaded with saldo_inicial/cargos/abonos rotated:
 This script:
 1. Rotates the three columns back to their correct positions
 2. Recalculates saldo_final using _rebuild_account_balances logic
+
+Amounts are stored as BIGINT cents; the recalculation works in cents and
+only the printed totals are converted back to pesos.
 """
 import sys
 import os
+import numpy as np
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app import create_app
@@ -37,7 +41,7 @@ with app.app_context():
 
     # Verify totals
     result = db.session.execute(db.text("""
-        SELECT ROUND(SUM(cargos),2), ROUND(SUM(abonos),2), ROUND(SUM(saldo_inicial),2)
+        SELECT SUM(cargos) / 100.0, SUM(abonos) / 100.0, SUM(saldo_inicial) / 100.0
         FROM transacciones WHERE genero IN ('1','2','3','4','5')
     """)).fetchone()
     print(f"  Generos 1-5: Cargos={result[0]:,.2f}  Abonos={result[1]:,.2f}  SI={result[2]:,.2f}")
@@ -45,68 +49,71 @@ with app.app_context():
     # Step 2: Recalculate saldo_final per account
     print("\nStep 2: Recalculating saldo_final per account...")
 
-    cuentas = db.session.execute(db.text(
-        "SELECT DISTINCT cuenta_contable FROM transacciones ORDER BY cuenta_contable"
-    )).fetchall()
-
-    total_cuentas = len(cuentas)
-    print(f"  {total_cuentas} cuentas a procesar...")
+    # One ordered read of every account instead of one query per account
+    rows = db.session.execute(db.text("""
+        SELECT id, cuenta_contable, saldo_inicial, cargos, abonos, genero
+        FROM transacciones
+        WHERE cuenta_contable IS NOT NULL
+        ORDER BY cuenta_contable, fecha_transaccion, id
+    """)).fetchall()
 
-    DEUDORA_GENEROS = {'1', '5', '8'}  # activo, gastos, presupuestal
     ACREEDORA_GENEROS = {'2', '3', '4'}  # pasivo, hacienda publica, ingresos
-
-    batch_count = 0
-    for i, (cuenta,) in enumerate(cuentas):
-        rows = db.session.execute(db.text("""
-            SELECT id, saldo_inicial, cargos, abonos, genero
-            FROM transacciones
-            WHERE cuenta_contable = :cuenta
-            ORDER BY fecha_transaccion, id
-        """), {"cuenta": cuenta}).fetchall()
-
-        if not rows:
-            continue
-
-        # Determine account nature from genero
-        genero = rows[0][4] or ''
-        if genero in DEUDORA_GENEROS:
-            # deudora: saldo_final = saldo_inicial + cargos - abonos
-            sign_cargo, sign_abono = 1, -1
-        elif genero in ACREEDORA_GENEROS:
-            # acreedora: saldo_final = saldo_inicial - cargos + abonos
-            sign_cargo, sign_abono = -1, 1
-        else:
-            # default to deudora
-            sign_cargo, sign_abono = 1, -1
-
-        saldo_actual = None
-        for row_id, si, cargos, abonos, _ in rows:
-            si = float(si or 0)
-            cargos = float(cargos or 0)
-            abonos = float(abonos or 0)
-
-            if saldo_actual is not None:
-                si = saldo_actual
-
-            saldo_actual = si + (sign_cargo * cargos) + (sign_abono * abonos)
-
+    BATCH_SIZE = 5000
+
+    total_rows = len(rows)
+    if total_rows:
+        ids, cuentas, saldos_iniciales, cargos, abonos, generos = (
+            np.array(column, dtype=object) for column in zip(*rows)
+        )
+        cargos = np.array([int(value or 0) for value in cargos], dtype=np.int64)
+        abonos = np.array([int(value or 0) for value in abonos], dtype=np.int64)
+        saldos_iniciales = np.array([int(value or 0) for value in saldos_iniciales], dtype=np.int64)
+
+        # Each account is a contiguous block of the ordered rows
+        is_first = np.empty(total_rows, dtype=bool)
+        is_first[0] = True
+        np.not_equal(cuentas[1:], cuentas[:-1], out=is_first[1:])
+        starts = np.flatnonzero(is_first)
+        block_ids = np.cumsum(is_first) - 1
+        total_cuentas = len(starts)
+        print(f"  {total_cuentas} cuentas a procesar...")
+
+        # Account nature from the genero of its first row:
+        #   deudora:   saldo_final = saldo_inicial + cargos - abonos
+        #   acreedora: saldo_final = saldo_inicial - cargos + abonos
+        # anything else defaults to deudora
+        acreedoras = np.array([(genero or '') in ACREEDORA_GENEROS for genero in generos[starts]], dtype=bool)
+        deltas = np.where(acreedoras[block_ids], abonos - cargos, cargos - abonos)
+
+        # Running balance per account: the first row keeps its saldo_inicial,
+        # every later row starts from the previous saldo_final.
+        movements = np.where(is_first, saldos_iniciales, 0) + deltas
+        saldos_finales = np.cumsum(movements)
+        block_offsets = saldos_finales[starts] - movements[starts]
+        saldos_finales -= np.repeat(block_offsets, np.diff(np.append(starts, total_rows)))
+        saldos_iniciales = saldos_finales - deltas
+
+        params = [
+            {"si": si, "sf": sf, "id": row_id}
+            for si, sf, row_id in zip(saldos_iniciales.tolist(), saldos_finales.tolist(), ids.tolist())
+        ]
+        for start in range(0, total_rows, BATCH_SIZE):
             db.session.execute(db.text("""
                 UPDATE transacciones
                 SET saldo_inicial = :si, saldo_final = :sf
                 WHERE id = :id
-            """), {"si": round(si, 2), "sf": round(saldo_actual, 2), "id": row_id})
-
-        batch_count += 1
-        if batch_count % 500 == 0:
+            """), params[start:start + BATCH_SIZE])
             db.session.commit()
-            print(f"  Procesadas {i+1}/{total_cuentas} cuentas...")
+            print(f"  Actualizados {min(start + BATCH_SIZE, total_rows)}/{total_rows} registros...")
+    else:
+        total_cuentas = 0
 
     db.session.commit()
     print(f"  Completado: {total_cuentas} cuentas recalculadas.")
 
     # Final verification
     result = db.session.execute(db.text("""
-        SELECT ROUND(SUM(cargos),2), ROUND(SUM(abonos),2)
+        SELECT SUM(cargos) / 100.0, SUM(abonos) / 100.0
         FROM transacciones WHERE genero IN ('1','2','3','4','5')
     """)).fetchone()
     print(f"\nVerificación final (generos 1-5):")
@@ -116,7 +123,7 @@ with app.app_context():
 
     # Also check all generos
     result_all = db.session.execute(db.text("""
-        SELECT ROUND(SUM(cargos),2), ROUND(SUM(abonos),2)
+        SELECT SUM(cargos) / 100.0, SUM(abonos) / 100.0
         FROM transacciones
     """)).fetchone()
     print(f"\nTodos los generos:")
@@ -4,7 +4,6 @@ Uso: python import_ejecutivo_danny.py
 """
 import os
 import sys
-from io import BytesIO
 
 # Necesario para que funcione fuera del contexto de Flask
 os.environ.setdefault("FLASK_ENV", "development")
@@ -12,7 +11,7 @@ os.environ.setdefault("FLASK_ENV", "development")
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app import create_app
-from scripts.utils import process_files_to_database
+from scripts.utils import process_files_to_database, _map_input_file
 
 FILES_DIR = os.path.join(os.path.dirname(__file__), "example_SIIF", "input", "EJECUTIVO_DANNY")
 
@@ -59,8 +58,7 @@ def main():
 
         for fname, path in available_files:
             print(f"\n>>> Importando archivo: {fname}")
-            with open(path, "rb") as fh:
-                file_list = [(fname, BytesIO(fh.read()))]
+            file_list = [(fname, _map_input_file(path))]
 
             try:
                 lote_id, total = process_files_to_database(
@@ -74,10 +72,14 @@ def main():
                     selected_ente_siglas=ENTE["siglas"],
                     selected_ente_nombre=ENTE["nombre"],
                     selected_ente_grupo=ENTE["clasificacion"],
+                    max_workers=app.config.get("MAX_WORKERS"),
+                    copy_workers=app.config.get("COPY_WORKERS"),
                 )
             except Exception as e:
                 print(f"\nERROR EN {fname}: {e}")
                 sys.exit(1)
+            finally:
+                file_list[0][1].close()
 
             total_insertados += total
             lotes.append((fname, lote_id, total))
@@ -77,6 +77,21 @@ def _resolve_sqlite_path(app) -> Path:
     return Path(app.instance_path) / db_path.name
 
 
+AMOUNT_COLUMNS = ("saldo_inicial", "cargos", "abonos", "saldo_final")
+
+
+def _row_in_pesos(row: sqlite3.Row) -> dict:
+    # Los montos se guardan en centavos (BIGINT).
+    payload = dict(row)
+    for column in AMOUNT_COLUMNS:
+        payload[column] = (payload[column] or 0) / 100
+    return payload
+
+
+def _to_centavos(value: float) -> int:
+    return int(round(value * 100))
+
+
 def _build_corrected_rows(account_rows: list[dict]) -> tuple[list[tuple], float, float]:
     if not account_rows:
         return [], 0.0, 0.0
@@ -132,10 +147,10 @@ def _build_corrected_rows(account_rows: list[dict]) -> tuple[list[tuple], float,
 
         updates.append(
             (
-                saldo_inicial,
-                cargos,
-                abonos,
-                saldo_actual,
+                _to_centavos(saldo_inicial),
+                _to_centavos(cargos),
+                _to_centavos(abonos),
+                _to_centavos(saldo_actual),
                 _hash_transaccion_row(payload),
                 row["id"],
             )
@@ -203,7 +218,7 @@ def main() -> None:
             if cuenta_contable != current_account:
                 flush_account()
                 current_account = cuenta_contable
-            account_rows.append(dict(row))
+            account_rows.append(_row_in_pesos(row))
 
         flush_account()
 
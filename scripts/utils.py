@@ -1,25 +1,59 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from io import BytesIO
+from functools import lru_cache
+from io import BytesIO, StringIO
 import hashlib
 import zipfile
 import xml.etree.ElementTree as ET
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, List, NamedTuple, Optional, Tuple
 import logging
+import mmap
+import multiprocessing
+import os
 import re
-import traceback
+import sys
+import threading
 import uuid
 
 import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+try:
+    import python_calamine
+except ImportError:  # lector Rust opcional; sin él se usa openpyxl
+    python_calamine = None
+try:
+    import pyarrow
+except ImportError:  # almacenamiento Arrow opcional para el texto de las hojas
+    pyarrow = None
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import Index
+from sqlalchemy.types import TypeDecorator
 
 # Base de datos
 
 db = SQLAlchemy()
 
 
+class Centavos(TypeDecorator):
+    """Monto guardado como BIGINT en centavos y expuesto como float en pesos."""
+    impl = db.BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(round(float(value) * 100))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return float(value) / 100
+
+
 class Transaccion(db.Model):
     """Modelo para transacciones contables"""
     __tablename__ = 'transacciones'
@@ -61,11 +95,11 @@ class Transaccion(db.Model):
     descripcion = db.Column(db.Text)
     orden_pago = db.Column(db.String(50))
 
-    # Montos
-    saldo_inicial = db.Column(db.Numeric(15, 2), default=0)
-    cargos = db.Column(db.Numeric(15, 2), default=0)
-    abonos = db.Column(db.Numeric(15, 2), default=0)
-    saldo_final = db.Column(db.Numeric(15, 2), default=0)
+    # Montos (centavos en BIGINT)
+    saldo_inicial = db.Column(Centavos, default=0)
+    cargos = db.Column(Centavos, default=0)
+    abonos = db.Column(Centavos, default=0)
+    saldo_final = db.Column(Centavos, default=0)
     hash_registro = db.Column(db.String(64), unique=True, index=True)
 
     # Índices compuestos para consultas comunes
@@ -73,42 +107,48 @@ class Transaccion(db.Model):
         Index('idx_cuenta_fecha', 'cuenta_contable', 'fecha_transaccion'),
         Index('idx_dependencia_fecha', 'dependencia', 'fecha_transaccion'),
         Index('idx_lote_cuenta', 'lote_id', 'cuenta_contable'),
+        Index('idx_fecha_cuenta_id', 'fecha_transaccion', 'cuenta_contable', 'id'),
     )
 
     def to_dict(self):
         """Convierte el modelo a diccionario"""
+        return Transaccion.row_to_dict(self)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Convierte un modelo o una fila de columnas (Row) a diccionario"""
         return {
-            'id': self.id,
-            'lote_id': self.lote_id,
-            'archivo_origen': self.archivo_origen,
-            'fecha_carga': self.fecha_carga.isoformat() if self.fecha_carga else None,
-            'ente_siglas_catalogo': self.ente_siglas_catalogo,
-            'ente_nombre_catalogo': self.ente_nombre_catalogo,
-            'ente_grupo_catalogo': self.ente_grupo_catalogo,
-            'cuenta_contable': self.cuenta_contable,
-            'nombre_cuenta': self.nombre_cuenta,
-            'genero': self.genero,
-            'grupo': self.grupo,
-            'rubro': self.rubro,
-            'cuenta': self.cuenta,
-            'subcuenta': self.subcuenta,
-            'dependencia': self.dependencia,
-            'unidad_responsable': self.unidad_responsable,
-            'centro_costo': self.centro_costo,
-            'proyecto_presupuestario': self.proyecto_presupuestario,
-            'fuente': self.fuente,
-            'subfuente': self.subfuente,
-            'tipo_recurso': self.tipo_recurso,
-            'partida_presupuestal': self.partida_presupuestal,
-            'fecha_transaccion': self.fecha_transaccion.strftime('%d/%m/%Y') if self.fecha_transaccion else None,
-            'poliza': self.poliza,
-            'beneficiario': self.beneficiario,
-            'descripcion': self.descripcion,
-            'orden_pago': self.orden_pago,
-            'saldo_inicial': float(self.saldo_inicial) if self.saldo_inicial else 0,
-            'cargos': float(self.cargos) if self.cargos else 0,
-            'abonos': float(self.abonos) if self.abonos else 0,
-            'saldo_final': float(self.saldo_final) if self.saldo_final else 0,
+            'id': row.id,
+            'lote_id': row.lote_id,
+            'archivo_origen': row.archivo_origen,
+            'fecha_carga': row.fecha_carga.isoformat() if row.fecha_carga else None,
+            'ente_siglas_catalogo': row.ente_siglas_catalogo,
+            'ente_nombre_catalogo': row.ente_nombre_catalogo,
+            'ente_grupo_catalogo': row.ente_grupo_catalogo,
+            'cuenta_contable': row.cuenta_contable,
+            'nombre_cuenta': row.nombre_cuenta,
+            'genero': row.genero,
+            'grupo': row.grupo,
+            'rubro': row.rubro,
+            'cuenta': row.cuenta,
+            'subcuenta': row.subcuenta,
+            'dependencia': row.dependencia,
+            'unidad_responsable': row.unidad_responsable,
+            'centro_costo': row.centro_costo,
+            'proyecto_presupuestario': row.proyecto_presupuestario,
+            'fuente': row.fuente,
+            'subfuente': row.subfuente,
+            'tipo_recurso': row.tipo_recurso,
+            'partida_presupuestal': row.partida_presupuestal,
+            'fecha_transaccion': row.fecha_transaccion.strftime('%d/%m/%Y') if row.fecha_transaccion else None,
+            'poliza': row.poliza,
+            'beneficiario': row.beneficiario,
+            'descripcion': row.descripcion,
+            'orden_pago': row.orden_pago,
+            'saldo_inicial': row.saldo_inicial or 0,
+            'cargos': row.cargos or 0,
+            'abonos': row.abonos or 0,
+            'saldo_final': row.saldo_final or 0,
         }
 
 
@@ -235,18 +275,33 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Patrones y tablas precompilados para las normalizaciones de texto frecuentes
+ACCENT_TRANSLATION = str.maketrans("áéíóúüñ", "aeiouun")
+_HEADER_LABEL_RE = re.compile(r"[^a-z0-9]+")
+_PERIOD_START_RE = re.compile(r"\b(\d{2}/\d{2}/\d{4})\b")
+_SHEET_NUMBER_RE = re.compile(r"sheet(\d+)\.xml$")
+_WORKSHEET_PART_RE = re.compile(r"xl/worksheets/sheet\d+\.xml")
+_NUMERIC_TEXT_RE = re.compile(r"[^\d\.-]")
+# Para textos ASCII la misma limpieza que _NUMERIC_TEXT_RE, con bytes.translate
+_NUMERIC_TEXT_DELETE = bytes(
+    code for code in range(128) if not (chr(code).isdigit() or chr(code) in ".-")
+)
+_AMOUNT_PUNCTUATION = str.maketrans("", "", ",.-")
+_FLOAT_START_CHARS = frozenset("+-.iInN")
+
+
 def _norm(s):
     """Normaliza strings para comparación"""
-    s = str(s or "").strip().lower()
-    rep = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n"}
-    for k, v in rep.items():
-        s = s.replace(k, v)
-    s = re.sub(r"\s+", " ", s)
-    return s
+    # split() sin argumentos corta en las mismas rachas de espacios que \s+
+    # y el join las deja en un solo espacio, sin pasar por el motor de regex.
+    return " ".join(str(s or "").lower().translate(ACCENT_TRANSLATION).split())
 
 
+@lru_cache(maxsize=4096)
 def _norm_header_label(value):
-    return re.sub(r"[^a-z0-9]+", "", _norm(value))
+    # Los encabezados y las opciones buscadas se repiten en cada columna, cada
+    # campo mapeado y cada archivo: se normalizan una sola vez.
+    return _HEADER_LABEL_RE.sub("", _norm(value))
 
 
 def _header_label_matches(value, options):
@@ -268,34 +323,177 @@ def _normalize_dependency_code(value):
     return code
 
 
-def _split_cuenta_contable_vertical(cuenta_str):
-    """Divide la cuenta contable en componentes"""
-    s = str(cuenta_str).strip().upper()
-    s = re.sub(r"[^0-9A-Z]", "", s).ljust(21, "0")
+CUENTA_COMPONENT_COLUMNS = [
+    "genero",
+    "grupo",
+    "rubro",
+    "cuenta",
+    "subcuenta",
+    "dependencia",
+    "unidad_responsable",
+    "centro_costo",
+    "proyecto_presupuestario",
+    "fuente",
+    "subfuente",
+    "tipo_recurso",
+    "partida_presupuestal",
+]
 
-    return {
-        "genero": s[0],
-        "grupo": s[1],
-        "rubro": s[2],
-        "cuenta": s[3],
-        "subcuenta": s[4],
-        "dependencia": s[5:7],
-        "unidad_responsable": s[7:9],
-        "centro_costo": s[9:11],
-        "proyecto_presupuestario": s[11:13],
-        "fuente": s[13],
-        "subfuente": s[14:16],
-        "tipo_recurso": s[16],
-        "partida_presupuestal": s[17:21],
-    }
+
+class _CuentaCharFilter(dict):
+    """Tabla de str.translate que conserva solo 0-9 y A-Z (equivale a [^0-9A-Z])"""
+
+    def __missing__(self, ordinal):
+        kept = ordinal if ("0" <= chr(ordinal) <= "9" or "A" <= chr(ordinal) <= "Z") else None
+        self[ordinal] = kept
+        return kept
+
+
+_CUENTA_CHARS = _CuentaCharFilter()
+
+
+CUENTA_COMPONENT_WIDTHS = [1, 1, 1, 1, 1, 2, 2, 2, 2, 1, 2, 1, 4]
+
+
+def _split_cuentas_contables(values):
+    """Divide un arreglo de cuentas contables en sus 13 componentes (DataFrame)"""
+    # Cada cuenta se limpia (mayúsculas, solo 0-9A-Z) y se rellena con "0" a 21
+    # caracteres: las cuentas quedan como matriz de caracteres (n, 21) de ancho
+    # fijo y cada componente es un corte de columnas de CUENTA_COMPONENT_WIDTHS,
+    # sin un dict ni slices de str por cuenta.
+    # La normalización va en una sola pasada de métodos de str (cuatro pasadas
+    # del accesor .str costaban más que el propio corte).
+    normalized = [
+        str(value).strip().upper().translate(_CUENTA_CHARS).ljust(21, "0")
+        for value in values
+    ]
+    chars = np.array(normalized, dtype="U21").view(np.uint32).reshape(-1, 21)
+
+    componentes = {}
+    start = 0
+    for column, width in zip(CUENTA_COMPONENT_COLUMNS, CUENTA_COMPONENT_WIDTHS):
+        block = np.ascontiguousarray(chars[:, start:start + width])
+        componentes[column] = block.view(f"U{width}").ravel()
+        start += width
+    return pd.DataFrame(componentes, columns=CUENTA_COMPONENT_COLUMNS)
+
+
+# Componentes ya divididos (con la dependencia normalizada) por cuenta contable.
+# Las mismas cuentas se repiten de una carga a otra: solo las nuevas se dividen.
+CUENTA_COMPONENTS_CACHE_SIZE = 200_000
+_cuenta_components_cache = {}
+
+
+def _cuenta_components(cuentas_unicas):
+    """Componentes de cada cuenta distinta, reutilizando los de cargas anteriores"""
+    cache = _cuenta_components_cache
+    resolved = {}
+    missing = []
+    for cuenta in cuentas_unicas:
+        components = cache.get(cuenta) if isinstance(cuenta, str) else None
+        if components is None:
+            missing.append(cuenta)
+        else:
+            resolved[cuenta] = components
+
+    if missing:
+        # El corte de ancho fijo ya deja la dependencia normalizada (dos
+        # caracteres 0-9A-Z): no hace falta _normalize_dependency_code por fila.
+        split = _split_cuentas_contables(missing)
+        new_components = list(zip(*(split[column].tolist() for column in CUENTA_COMPONENT_COLUMNS)))
+        if len(cache) + len(missing) > CUENTA_COMPONENTS_CACHE_SIZE:
+            cache.clear()
+        for cuenta, components in zip(missing, new_components):
+            resolved[cuenta] = components
+            if isinstance(cuenta, str):
+                cache[cuenta] = components
+
+    # El caché guarda una tupla por cuenta; el DataFrame se arma por columnas
+    # (una transposición) en lugar de inferir tipos fila por fila.
+    filas = [resolved[cuenta] for cuenta in cuentas_unicas]
+    return pd.DataFrame(
+        dict(zip(CUENTA_COMPONENT_COLUMNS, map(list, zip(*filas)))),
+        columns=CUENTA_COMPONENT_COLUMNS,
+    )
 
 
 def _to_numeric_fast(s):
     """Convierte series a numérico de forma rápida"""
-    return pd.to_numeric(
-        s.astype(str).str.replace(r"[^\d\.-]", "", regex=True),
-        errors="coerce"
-    ).fillna(0.0)
+    # Los importes se repiten mucho ("0.00", vacíos, montos fijos): la limpieza
+    # con regex y el parseo se hacen una vez por valor distinto.
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    # \d también acepta dígitos no ASCII: solo esos textos pasan por el regex.
+    # Los faltantes siguen como NaN (astype(str) los conserva).
+    texts = [
+        text if not isinstance(text, str)
+        else text.encode().translate(None, _NUMERIC_TEXT_DELETE).decode() if text.isascii()
+        else _NUMERIC_TEXT_RE.sub("", text)
+        for text in pd.Series(uniques, dtype=object).astype(str).tolist()
+    ]
+    converted = pd.to_numeric(pd.Series(texts, dtype=object), errors="coerce").fillna(0.0)
+    return pd.Series(converted.to_numpy(dtype=float)[codes], index=s.index, name=s.name)
+
+
+def _parse_dates_unique(s, fmt="%d/%m/%Y"):
+    """Convierte fechas parseando una sola vez cada valor distinto"""
+    codes, uniques = pd.factorize(s)
+    parsed = pd.to_datetime(pd.Index(uniques), format=fmt, errors="coerce", cache=True)
+    return pd.Series(
+        parsed.take(codes, allow_fill=True, fill_value=pd.NaT),
+        index=s.index,
+    )
+
+
+def _format_fecha(fecha_raw, cache):
+    """Formatea una fecha como dd/mm/aaaa; el texto original si no se puede parsear"""
+    key = (type(fecha_raw), fecha_raw)
+    fecha = cache.get(key)
+    if fecha is None:
+        try:
+            fecha = pd.to_datetime(fecha_raw).strftime("%d/%m/%Y")
+        except Exception:
+            fecha = str(fecha_raw).strip()
+        cache[key] = fecha
+    return fecha
+
+
+def _join_row_texts(values):
+    """Texto de cada fila (celdas unidas por espacio), armado columna por columna"""
+    if isinstance(values, pd.DataFrame):
+        values = values.fillna("").astype(str).to_numpy(dtype=object)
+    texts = values[:, 0].copy()
+    for col_idx in range(1, values.shape[1]):
+        texts = texts + " " + values[:, col_idx]
+    return pd.Series(texts, dtype=object)
+
+
+def _first_matching_row(texts, required, any_of):
+    """Posición de la primera fila que contiene todos los required y algún any_of"""
+    hits = np.ones(len(texts), dtype=bool)
+    for token in required:
+        hits &= texts.str.contains(token, regex=False).to_numpy(dtype=bool)
+    any_hits = np.zeros(len(texts), dtype=bool)
+    for token in any_of:
+        any_hits |= texts.str.contains(token, regex=False).to_numpy(dtype=bool)
+    hits &= any_hits
+    return int(hits.argmax()) if hits.any() else None
+
+
+def _parse_iso_fechas(values):
+    """{texto: dd/mm/aaaa} para los valores distintos con fecha ISO válida"""
+    candidates = [value for value in pd.unique(values) if isinstance(value, str) and "-" in value]
+    if not candidates:
+        return {}
+    try:
+        parsed = pd.to_datetime(pd.Index(candidates, dtype=object), format="ISO8601", errors="coerce")
+    except (ValueError, TypeError):
+        return {}
+    formatted = parsed.strftime("%d/%m/%Y")
+    return {
+        value: fecha
+        for value, fecha, is_missing in zip(candidates, formatted, parsed.isna())
+        if not is_missing
+    }
 
 
 def _format_amount(val):
@@ -306,22 +504,79 @@ def _format_amount(val):
 
 
 def _extract_period_start(text):
-    match = re.search(r"\b(\d{2}/\d{2}/\d{4})\b", str(text or ""))
+    match = _PERIOD_START_RE.search(str(text or ""))
     return match.group(1) if match else ""
 
 
+@lru_cache(maxsize=65536)
+def _classify_auxiliar_value(val):
+    """Clasifica una celda del auxiliar: (es_numerica, es_monetaria, valor)"""
+    # Importes, ceros y textos se repiten mucho entre filas: cada valor distinto
+    # se analiza una sola vez.
+    cleaned = val.replace(",", "").replace(" ", "")
+    # float() solo acepta textos que empiezan con signo, punto, dígito o
+    # inf/nan: el resto se descarta sin pagar el costo de la excepción.
+    first_char = cleaned.lstrip()[:1]
+    if not first_char or not (first_char in _FLOAT_START_CHARS or first_char.isdigit()):
+        return False, False, None
+    try:
+        numeric_value = float(cleaned)
+    except ValueError:
+        return False, False, None
+    is_monetary = "," in val or "." in cleaned or val.strip() == "0"
+    return True, is_monetary, numeric_value
+
+
+# Clases de celda del auxiliar sin encabezados reconocibles
+AUX_CELL_EMPTY, AUX_CELL_TEXT, AUX_CELL_MONEY, AUX_CELL_OP = range(4)
+
+
+def _auxiliar_cell_kind(val):
+    """Clase de una celda ya recortada: vacía, texto, importe o candidata a O.P."""
+    if not val:
+        return AUX_CELL_EMPTY
+    is_numeric, is_monetary, numeric_value = _classify_auxiliar_value(val)
+    if not is_numeric:
+        return AUX_CELL_TEXT
+    # Entero distinto de cero sin separadores: número de O.P. si es el primero
+    if not is_monetary and numeric_value and numeric_value.is_integer():
+        return AUX_CELL_OP
+    return AUX_CELL_MONEY
+
+
+def _is_missing(value):
+    """pd.isna para una celda escalar, sin pasar por el despacho de pandas"""
+    # None, NaN, NaT y pd.NA; NaN y NaT son los únicos valores distintos de sí mismos
+    return value is None or value is pd.NA or value != value
+
+
+def _iter_column_values(frame, columns):
+    """Itera las filas como tuplas de las columnas dadas (None si la columna no existe)"""
+    # Equivale a row.get(col) sobre iterrows/apply, sin construir una Series por fila.
+    missing = [None] * len(frame)
+    return zip(*[
+        frame[column].to_numpy(dtype=object) if column in frame.columns else missing
+        for column in columns
+    ])
+
+
 def _infer_account_balance_side(account_rows, tolerance=0.01):
     best_side = None
     best_diff = None
+    check_source_initial = "_saldo_inicial_origen_present" in account_rows.columns
+    rows = _iter_column_values(
+        account_rows,
+        ["_saldo_inicial_origen_present", "saldo_inicial", "cargos", "abonos", "saldo_final_origen"],
+    )
 
-    for _, row in account_rows.iterrows():
-        if "_saldo_inicial_origen_present" in account_rows.columns and not bool(row.get("_saldo_inicial_origen_present")):
+    for source_initial_present, saldo_inicial, cargos, abonos, saldo_final_origen in rows:
+        if check_source_initial and not bool(source_initial_present):
             continue
 
-        saldo_inicial = float(row.get("saldo_inicial") or 0)
-        cargos = float(row.get("cargos") or 0)
-        abonos = float(row.get("abonos") or 0)
-        saldo_final_origen = float(row.get("saldo_final_origen") or 0)
+        saldo_inicial = float(saldo_inicial or 0)
+        cargos = float(cargos or 0)
+        abonos = float(abonos or 0)
+        saldo_final_origen = float(saldo_final_origen or 0)
 
         if abs(cargos) <= tolerance and abs(abonos) <= tolerance:
             continue
@@ -350,18 +605,70 @@ def _infer_account_balance_side(account_rows, tolerance=0.01):
     return "deudora"
 
 
-def _rebuild_account_balances(base):
+def _infer_account_balance_sides(base, block_ids, starts, tolerance=0.01):
+    """_infer_account_balance_side para todas las cuentas a la vez (True = acreedora)"""
+    # Misma regla que la versión por cuenta, con las cuentas en bloques
+    # contiguos que empiezan en `starts`: la primera fila que decide un solo
+    # lado gana; si ninguna decide, la de menor diferencia; si no, el género.
+    n = len(base)
+    positions = np.arange(n)
+    saldo_inicial = base["saldo_inicial"].to_numpy(dtype=float)
+    cargos = base["cargos"].to_numpy(dtype=float)
+    abonos = base["abonos"].to_numpy(dtype=float)
+    saldo_final_origen = base["saldo_final_origen"].to_numpy(dtype=float)
+
+    considered = (np.abs(cargos) > tolerance) | (np.abs(abonos) > tolerance)
+    if "_saldo_inicial_origen_present" in base.columns:
+        considered &= base["_saldo_inicial_origen_present"].to_numpy(dtype=bool)
+
+    diff_deudor = np.abs(saldo_inicial + cargos - abonos - saldo_final_origen)
+    diff_acreedor = np.abs(saldo_inicial - cargos + abonos - saldo_final_origen)
+    only_deudor = considered & (diff_deudor <= tolerance) & (diff_acreedor > tolerance)
+    only_acreedor = considered & (diff_acreedor <= tolerance) & (diff_deudor > tolerance)
+
+    first_decisive = np.minimum.reduceat(np.where(only_deudor | only_acreedor, positions, n), starts)
+    has_decisive = first_decisive < n
+
+    current_diff = np.where(considered, np.minimum(diff_deudor, diff_acreedor), np.inf)
+    best_diff = np.minimum.reduceat(current_diff, starts)
+    is_best = considered & (current_diff == best_diff[block_ids])
+    first_best = np.minimum.reduceat(np.where(is_best, positions, n), starts)
+    has_best = first_best < n
+
+    genero = base["genero"].to_numpy(dtype=object)[starts]
+    acreedoras = np.fromiter(
+        (str(value).strip() in {"2", "3", "4", "9"} for value in genero), dtype=bool, count=len(starts)
+    )
+    best_rows = first_best[has_best]
+    acreedoras[has_best] = diff_acreedor[best_rows] < diff_deudor[best_rows]
+    acreedoras[has_decisive] = only_acreedor[first_decisive[has_decisive]]
+    return acreedoras
+
+
+ACCOUNT_SORT_COLUMNS = ["cuenta_contable", "_periodo_inicio_dt", "_archivo_orden", "_orden_auxiliar"]
+
+
+def _sort_by_account(base):
+    columns = ACCOUNT_SORT_COLUMNS
+    if "_cuenta_codigo" in base.columns:
+        # El código entero (factorize ordenado) sigue el mismo orden que el
+        # texto de la cuenta: se ordena comparando enteros en lugar de cadenas.
+        columns = ["_cuenta_codigo"] + ACCOUNT_SORT_COLUMNS[1:]
+    return base.sort_values(columns, kind="stable").reset_index(drop=True)
+
+
+def _rebuild_account_balances(base, presorted=False):
     if base.empty:
         return base
 
-    sort_columns = ["cuenta_contable", "_periodo_inicio_dt", "_archivo_orden", "_orden_auxiliar"]
-    base = base.sort_values(sort_columns, kind="stable").reset_index(drop=True).copy()
-
-    saldo_inicial_values = base["saldo_inicial"].to_numpy(dtype=float, copy=True)
-    cargos_values = base["cargos"].to_numpy(dtype=float, copy=False)
-    abonos_values = base["abonos"].to_numpy(dtype=float, copy=False)
-    saldo_final_origen_values = base["saldo_final_origen"].to_numpy(dtype=float, copy=False)
-    saldo_final_values = np.zeros(len(base), dtype=float)
+    if not presorted:
+        base = _sort_by_account(base)
+    # Códigos enteros por cuenta: agrupar y comparar enteros en lugar de cadenas.
+    # Tras el ordenamiento cada cuenta ocupa un bloque contiguo.
+    if "_cuenta_codigo" in base.columns:
+        cuenta_codes = base["_cuenta_codigo"].to_numpy()
+    else:
+        cuenta_codes = pd.factorize(base["cuenta_contable"], use_na_sentinel=False)[0]
 
     if "_saldo_inicial_origen_present" in base.columns:
         has_source_initial_values = base["_saldo_inicial_origen_present"].to_numpy(dtype=bool, copy=False)
@@ -373,66 +680,55 @@ def _rebuild_account_balances(base):
     else:
         has_source_final_values = np.zeros(len(base), dtype=bool)
 
-    for _, account_rows in base.groupby("cuenta_contable", sort=False):
-        balance_side = _infer_account_balance_side(account_rows)
-        idx = account_rows.index.to_numpy(dtype=int)
-        account_saldo_inicial = saldo_inicial_values[idx].copy()
-        account_cargos = cargos_values[idx]
-        account_abonos = abonos_values[idx]
-        account_saldo_final = np.zeros(len(idx), dtype=float)
-
-        if len(idx) == 0:
-            continue
-
-        if not has_source_initial_values[idx[0]] and has_source_final_values[idx[0]]:
-            if balance_side == "acreedora":
-                account_saldo_inicial[0] = round(
-                    saldo_final_origen_values[idx[0]] + account_cargos[0] - account_abonos[0],
-                    2,
-                )
-            else:
-                account_saldo_inicial[0] = round(
-                    saldo_final_origen_values[idx[0]] - account_cargos[0] + account_abonos[0],
-                    2,
-                )
-
-        if balance_side == "acreedora":
-            account_saldo_final[0] = round(
-                account_saldo_inicial[0] - account_cargos[0] + account_abonos[0],
-                2,
-            )
-            for pos in range(1, len(idx)):
-                account_saldo_inicial[pos] = round(account_saldo_final[pos - 1], 2)
-                account_saldo_final[pos] = round(
-                    account_saldo_inicial[pos] - account_cargos[pos] + account_abonos[pos],
-                    2,
-                )
-        else:
-            account_saldo_final[0] = round(
-                account_saldo_inicial[0] + account_cargos[0] - account_abonos[0],
-                2,
-            )
-            for pos in range(1, len(idx)):
-                account_saldo_inicial[pos] = round(account_saldo_final[pos - 1], 2)
-                account_saldo_final[pos] = round(
-                    account_saldo_inicial[pos] + account_cargos[pos] - account_abonos[pos],
-                    2,
-                )
-
-        saldo_inicial_values[idx] = account_saldo_inicial
-        saldo_final_values[idx] = account_saldo_final
-
-    base["saldo_inicial"] = np.round(saldo_inicial_values, 2)
-    base["saldo_final"] = np.round(saldo_final_values, 2)
+    is_first = np.empty(len(base), dtype=bool)
+    is_first[0] = True
+    np.not_equal(cuenta_codes[1:], cuenta_codes[:-1], out=is_first[1:])
+    starts = np.flatnonzero(is_first)
+    # Número de bloque (0..n-1) de cada fila, sin importar qué códigos haya
+    block_ids = np.cumsum(is_first) - 1
+
+    acreedoras = _infer_account_balance_sides(base, block_ids, starts)
+    signs = np.where(acreedoras[block_ids], -1, 1)
+
+    # Se trabaja en centavos enteros: la suma acumulada es exacta y equivale a
+    # redondear a 2 decimales en cada paso. Las operaciones escriben sobre el
+    # mismo arreglo para no crear un temporal por cada paso de la expresión.
+    def _to_cents(column):
+        cents = base[column].to_numpy(dtype=float, copy=True)
+        np.multiply(cents, 100, out=cents)
+        np.rint(cents, out=cents)
+        return cents.astype(np.int64)
+
+    deltas = _to_cents("cargos")
+    np.subtract(deltas, _to_cents("abonos"), out=deltas)
+    np.multiply(deltas, signs, out=deltas)
+    openings = _to_cents("saldo_inicial")
+
+    needs_opening = is_first & ~has_source_initial_values & has_source_final_values
+    if needs_opening.any():
+        derived_openings = _to_cents("saldo_final_origen")
+        np.subtract(derived_openings, deltas, out=derived_openings)
+        np.copyto(openings, derived_openings, where=needs_opening)
+
+    movements = np.where(is_first, openings, 0)
+    np.add(movements, deltas, out=movements)
+    # Suma acumulada por cuenta: una sola cumsum global a la que se le resta
+    # lo acumulado antes del inicio de cada bloque.
+    saldo_final_cents = np.cumsum(movements)
+    block_offsets = saldo_final_cents[starts] - movements[starts]
+    saldo_final_cents -= np.repeat(block_offsets, np.diff(np.append(starts, len(base))))
+    saldo_inicial_cents = saldo_final_cents - deltas
+
+    base["saldo_inicial"] = saldo_inicial_cents / 100
+    base["saldo_final"] = saldo_final_cents / 100
 
     return base
 
 
-def _detect_fixed_auxiliar_layout(raw, header_row_idx):
-    if header_row_idx is None or raw.shape[1] < 9:
+def _detect_fixed_auxiliar_layout(header_row):
+    if len(header_row) < 9:
         return None
 
-    header_row = raw.iloc[header_row_idx]
     required_headers = {
         0: ["fecha"],
         1: ["poliza", "póliza"],
@@ -444,7 +740,7 @@ def _detect_fixed_auxiliar_layout(raw, header_row_idx):
     }
 
     for col_idx, options in required_headers.items():
-        if not _header_label_matches(header_row.iloc[col_idx], options):
+        if not _header_label_matches(header_row[col_idx], options):
             return None
 
     return {
@@ -460,6 +756,39 @@ def _detect_fixed_auxiliar_layout(raw, header_row_idx):
 
 CONTABLE_GENEROS = {"1", "2", "3", "4", "5"}
 
+# Columnas que se toman del DataFrame al insertar transacciones
+TRANSACCION_INSERT_COLUMNS = [
+    "archivo_origen",
+    "ente_siglas_catalogo",
+    "ente_nombre_catalogo",
+    "ente_grupo_catalogo",
+    "cuenta_contable",
+    "nombre_cuenta",
+    "genero",
+    "grupo",
+    "rubro",
+    "cuenta",
+    "subcuenta",
+    "dependencia",
+    "unidad_responsable",
+    "centro_costo",
+    "proyecto_presupuestario",
+    "fuente",
+    "subfuente",
+    "tipo_recurso",
+    "partida_presupuestal",
+    "fecha_transaccion",
+    "poliza",
+    "beneficiario",
+    "descripcion",
+    "orden_pago",
+    "saldo_inicial",
+    "cargos",
+    "abonos",
+    "saldo_final",
+    "hash_registro",
+]
+
 
 def _build_balance_error_message(
     total_cargos,
@@ -520,23 +849,28 @@ def _build_rollforward_error_message(invalid_rows):
 
 
 def _validate_reconstructed_rollforwards(base, lote_id, tolerance=0.3):
-    validation_rows = base[base["_saldo_final_origen_present"]].copy()
-    if validation_rows.empty:
+    present = base["_saldo_final_origen_present"].to_numpy(dtype=bool)
+    validation_count = int(present.sum())
+    if not validation_count:
         logger.info(f"Sin saldos finales origen para validar en lote {lote_id}")
         return
 
-    validation_rows["diff"] = (
-        validation_rows["saldo_final"] - validation_rows["saldo_final_origen"]
-    ).abs()
-    invalid_rows = validation_rows[validation_rows["diff"] > tolerance]
+    # Solo se recorren las dos columnas de importes; el resto de la fila se
+    # copia únicamente para los movimientos inválidos que van al mensaje.
+    diff = np.abs(
+        base["saldo_final"].to_numpy(dtype=float) - base["saldo_final_origen"].to_numpy(dtype=float)
+    )
+    invalid_mask = present & (diff > tolerance)
 
-    if invalid_rows.empty:
+    if not invalid_mask.any():
         logger.info(
             f"Rollforward OK en lote {lote_id}: "
-            f"{len(validation_rows):,} movimientos conciliados contra el auxiliar"
+            f"{validation_count:,} movimientos conciliados contra el auxiliar"
         )
         return
 
+    invalid_rows = base[invalid_mask].copy()
+    invalid_rows["diff"] = diff[invalid_mask]
     invalid_rows = invalid_rows.sort_values("diff", ascending=False)
     logger.error(
         f"Inconsistencia de saldos detectada en lote {lote_id}: "
@@ -548,7 +882,11 @@ def _validate_reconstructed_rollforwards(base, lote_id, tolerance=0.3):
 
 
 def _validate_contable_balance(base, lote_id, tolerance=0.01):
-    contable = base[base["genero"].isin(CONTABLE_GENEROS)].copy()
+    # Solo las columnas que se suman o agrupan, no la fila completa
+    contable = base.loc[
+        base["genero"].isin(CONTABLE_GENEROS),
+        ["archivo_origen", "fecha", "poliza", "cargos", "abonos"],
+    ]
     if contable.empty:
         logger.info(
             f"Sin movimientos contables de generos 1-5 en lote {lote_id}; "
@@ -591,10 +929,11 @@ def _validate_contable_balance(base, lote_id, tolerance=0.01):
         f"Cargos={total_cargos:,.2f} Abonos={total_abonos:,.2f} "
         f"Diferencia={balance_diff:,.2f}"
     )
-    for arch, grp in contable.groupby("archivo_origen"):
-        fc = float(grp["cargos"].sum())
-        fa = float(grp["abonos"].sum())
-        logger.info(f"  {arch}: Cargos={fc:,.2f} Abonos={fa:,.2f} Diff={fc - fa:,.2f}")
+    if logger.isEnabledFor(logging.INFO):
+        for arch, grp in contable.groupby("archivo_origen", observed=True):
+            fc = float(grp["cargos"].sum())
+            fa = float(grp["abonos"].sum())
+            logger.info(f"  {arch}: Cargos={fc:,.2f} Abonos={fa:,.2f} Diff={fc - fa:,.2f}")
 
     raise ValueError(
         _build_balance_error_message(
@@ -607,33 +946,47 @@ def _validate_contable_balance(base, lote_id, tolerance=0.01):
     )
 
 
-def _seed_historical_opening_balances(base, ente_siglas, tolerance=0.3):
+def _seed_historical_opening_balances(base, ente_siglas, tolerance=0.3, presorted=False):
     if base.empty or not ente_siglas:
         return base
 
-    sort_columns = ["cuenta_contable", "_periodo_inicio_dt", "_archivo_orden", "_orden_auxiliar"]
-    base = base.sort_values(sort_columns, kind="stable").copy()
+    if not presorted:
+        base = _sort_by_account(base)
     adjusted_accounts = []
 
-    for cuenta_contable, account_rows in base.groupby("cuenta_contable", sort=False):
-        first_idx = account_rows.index[0]
-        first_row = base.loc[first_idx]
-        first_date = first_row.get("fecha_transaccion")
-        if pd.isna(first_date):
+    # Solo interesa el primer movimiento de cada cuenta: basta con las
+    # posiciones donde cambia la cuenta, sin materializar cada grupo. Los
+    # valores se leen de arreglos (sin base.loc por cuenta) y los ajustes se
+    # escriben de una sola vez al final.
+    cuentas = base["cuenta_contable"]
+    first_indexes = base.index[~cuentas.duplicated() & cuentas.notna()]
+    first_rows = _iter_column_values(
+        base.loc[first_indexes],
+        [
+            "cuenta_contable", "fecha_transaccion", "saldo_final_origen", "_saldo_final_origen_present",
+            "saldo_inicial", "_saldo_inicial_origen_present", "cargos", "abonos", "genero", "fecha", "poliza",
+        ],
+    )
+    adjusted_indexes = []
+    for first_idx, (
+        cuenta_contable, first_date, saldo_final_origen, saldo_final_present,
+        saldo_inicial_actual, saldo_inicial_present, cargos, abonos, genero, fecha, poliza,
+    ) in zip(first_indexes, first_rows):
+        if _is_missing(first_date):
             continue
 
-        saldo_final_origen = float(first_row.get("saldo_final_origen") or 0)
-        if not bool(first_row.get("_saldo_final_origen_present")):
+        saldo_final_origen = float(saldo_final_origen or 0)
+        if not bool(saldo_final_present):
             continue
 
-        saldo_inicial_actual = float(first_row.get("saldo_inicial") or 0)
-        saldo_inicial_present = bool(first_row.get("_saldo_inicial_origen_present"))
+        saldo_inicial_actual = float(saldo_inicial_actual or 0)
+        saldo_inicial_present = bool(saldo_inicial_present)
         if saldo_inicial_present and abs(saldo_inicial_actual) > tolerance:
             continue
 
-        cargos = float(first_row.get("cargos") or 0)
-        abonos = float(first_row.get("abonos") or 0)
-        genero = str(first_row.get("genero") or "").strip()
+        cargos = float(cargos or 0)
+        abonos = float(abonos or 0)
+        genero = str(genero or "").strip()
         balance_side = "acreedora" if genero in {"2", "3", "4", "9"} else "deudora"
 
         if balance_side == "acreedora":
@@ -670,20 +1023,24 @@ def _seed_historical_opening_balances(base, ente_siglas, tolerance=0.3):
         if abs(saldo_final_desde_historico - saldo_final_origen) > tolerance:
             continue
 
-        base.loc[first_idx, "saldo_inicial"] = saldo_inicial_historico
-        base.loc[first_idx, "_saldo_inicial_origen_present"] = True
-        base.loc[first_idx, "_saldo_inicial_origen_text"] = f"{saldo_inicial_historico:.2f}"
+        adjusted_indexes.append(first_idx)
         adjusted_accounts.append(
             (
                 cuenta_contable,
                 saldo_inicial_historico,
                 saldo_final_origen,
-                first_row.get("fecha"),
-                first_row.get("poliza"),
+                fecha,
+                poliza,
             )
         )
 
     if adjusted_accounts:
+        saldos_historicos = [account[1] for account in adjusted_accounts]
+        base.loc[adjusted_indexes, "saldo_inicial"] = saldos_historicos
+        base.loc[adjusted_indexes, "_saldo_inicial_origen_present"] = True
+        base.loc[adjusted_indexes, "_saldo_inicial_origen_text"] = [
+            f"{saldo:.2f}" for saldo in saldos_historicos
+        ]
         logger.info(
             "Saldos iniciales historicos aplicados para %s cuenta(s) del ente %s",
             len(adjusted_accounts),
@@ -701,50 +1058,103 @@ def _seed_historical_opening_balances(base, ente_siglas, tolerance=0.3):
     return base
 
 
-def _hash_transaccion_row(row):
+HASH_TEXT_COLUMNS = [
+    "archivo_origen",
+    "cuenta_contable",
+    "nombre_cuenta",
+    "genero",
+    "grupo",
+    "rubro",
+    "cuenta",
+    "subcuenta",
+    "dependencia",
+    "unidad_responsable",
+    "centro_costo",
+    "proyecto_presupuestario",
+    "fuente",
+    "subfuente",
+    "tipo_recurso",
+    "partida_presupuestal",
+    "poliza",
+    "beneficiario",
+    "descripcion",
+    "orden_pago",
+    "ente_siglas_catalogo",
+    "ente_grupo_catalogo",
+]
+HASH_AMOUNT_COLUMNS = ["saldo_inicial", "cargos", "abonos", "saldo_final"]
+HASH_COLUMNS = HASH_TEXT_COLUMNS + HASH_AMOUNT_COLUMNS + ["fecha_transaccion"]
+
+
+def _hash_transaccion_values(values):
+    """Firma de un registro a partir de sus valores en el orden de HASH_COLUMNS"""
     # Include running balances so repeated source lines remain distinct after normalization.
-    parts = [
-        _norm(row.get("archivo_origen")),
-        _norm(row.get("cuenta_contable")),
-        _norm(row.get("nombre_cuenta")),
-        _norm(row.get("genero")),
-        _norm(row.get("grupo")),
-        _norm(row.get("rubro")),
-        _norm(row.get("cuenta")),
-        _norm(row.get("subcuenta")),
-        _norm(row.get("dependencia")),
-        _norm(row.get("unidad_responsable")),
-        _norm(row.get("centro_costo")),
-        _norm(row.get("proyecto_presupuestario")),
-        _norm(row.get("fuente")),
-        _norm(row.get("subfuente")),
-        _norm(row.get("tipo_recurso")),
-        _norm(row.get("partida_presupuestal")),
-        _norm(row.get("poliza")),
-        _norm(row.get("beneficiario")),
-        _norm(row.get("descripcion")),
-        _norm(row.get("orden_pago")),
-        _norm(row.get("ente_siglas_catalogo")),
-        _norm(row.get("ente_grupo_catalogo")),
-        _format_amount(row.get("saldo_inicial")),
-        _format_amount(row.get("cargos")),
-        _format_amount(row.get("abonos")),
-        _format_amount(row.get("saldo_final")),
-    ]
+    text_count = len(HASH_TEXT_COLUMNS)
+    amount_end = text_count + len(HASH_AMOUNT_COLUMNS)
+    parts = [_norm(value) for value in values[:text_count]]
+    parts.extend(_format_amount(value) for value in values[text_count:amount_end])
 
-    fecha = row.get("fecha_transaccion")
-    if pd.isna(fecha):
-        parts.append("")
-    else:
-        try:
-            parts.append(fecha.strftime("%Y-%m-%d"))
-        except Exception:
-            parts.append(str(fecha))
+    parts.append(_hash_fecha_text(values[amount_end]))
 
     fingerprint = "|".join(parts).encode("utf-8")
     return hashlib.sha256(fingerprint).hexdigest()
 
 
+def _hash_fecha_text(fecha):
+    # Un texto ya formateado se usa tal cual (antes: strftime fallaba y se usaba str())
+    if isinstance(fecha, str):
+        return fecha
+    if _is_missing(fecha):
+        return ""
+    try:
+        return fecha.strftime("%Y-%m-%d")
+    except Exception:
+        return str(fecha)
+
+
+def _hash_transaccion_row(row):
+    return _hash_transaccion_values([row.get(column) for column in HASH_COLUMNS])
+
+
+def _hash_column_texts(frame, column, formatter):
+    """Texto de firma de cada fila de una columna, formateando cada valor distinto una vez"""
+    if column not in frame.columns:
+        return [formatter(None)] * len(frame)
+    series = frame[column]
+    if series.dtype == object:
+        # Tipos mezclados: 1, 1.0 y True se agruparían juntos, se formatea fila por fila
+        return [formatter(value) for value in series.to_numpy(dtype=object)]
+    if series.dtype.kind == "f":
+        # Se agrupa por los bits del flotante para que -0.0 y 0.0 no se mezclen
+        values = series.to_numpy(dtype=np.float64)
+        bits, codes = np.unique(values.view(np.int64), return_inverse=True)
+        uniques = bits.view(np.float64).tolist()
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        uniques = uniques.tolist()
+    textos = np.array([formatter(value) for value in uniques], dtype=object)
+    return textos[codes].tolist()
+
+
+def _hash_transacciones(frame):
+    """Firmas de todas las filas, con los textos de firma calculados por columna"""
+    # Mismo texto que _hash_transaccion_values, pero _norm/_format_amount se
+    # aplican una vez por valor distinto de cada columna (archivos, cuentas,
+    # pólizas e importes se repiten en miles de filas) y cada fila solo une
+    # sus partes y calcula el sha256.
+    formatters = (
+        [_norm] * len(HASH_TEXT_COLUMNS)
+        + [_format_amount] * len(HASH_AMOUNT_COLUMNS)
+        + [_hash_fecha_text]
+    )
+    columnas = [
+        _hash_column_texts(frame, column, formatter)
+        for column, formatter in zip(HASH_COLUMNS, formatters)
+    ]
+    sha256 = hashlib.sha256
+    return [sha256("|".join(parts).encode("utf-8")).hexdigest() for parts in zip(*columnas)]
+
+
 _STRICT_NS_MAP = {
     "http://purl.oclc.org/ooxml/spreadsheetml/main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
     "http://purl.oclc.org/ooxml/officeDocument/relationships": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
@@ -755,7 +1165,7 @@ _STRICT_NS_MAP = {
 
 def _convert_strict_ooxml(file_bytes: bytes) -> bytes:
     """Convierte archivos OOXML Strict al formato Transitional que soporta openpyxl."""
-    src = BytesIO(file_bytes)
+    src = _excel_stream(file_bytes)
     dst = BytesIO()
     with zipfile.ZipFile(src, "r") as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
         for item in zin.infolist():
@@ -765,7 +1175,7 @@ def _convert_strict_ooxml(file_bytes: bytes) -> bytes:
                     text = data.decode("utf-8")
                     for old, new in _STRICT_NS_MAP.items():
                         text = text.replace(old, new)
-                    text = re.sub(r' conformance="strict"', "", text)
+                    text = text.replace(' conformance="strict"', "")
                     data = text.encode("utf-8")
                 except Exception:
                     pass
@@ -773,10 +1183,44 @@ def _convert_strict_ooxml(file_bytes: bytes) -> bytes:
     return dst.getvalue()
 
 
+class _MappedExcelFile:
+    """mmap como archivo de lectura (mmap no expone seekable() antes de 3.13)"""
+
+    def __init__(self, mapped):
+        self._mapped = mapped
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self._mapped, name)
+
+
+def _excel_stream(source):
+    """Stream de lectura sobre bytes o sobre un archivo mapeado, sin copiarlo"""
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    source.seek(0)
+    if isinstance(source, mmap.mmap):
+        return _MappedExcelFile(source)
+    return source
+
+
+def _read_excel_source(file_content):
+    # Un archivo mapeado (mmap) se lee en su lugar: pasarlo a bytes duplicaría
+    # el archivo completo en memoria mientras se procesa.
+    if isinstance(file_content, mmap.mmap):
+        return file_content
+    return file_content.read()
+
+
 def _is_strict_ooxml(file_bytes: bytes) -> bool:
     """Detecta si un archivo xlsx usa el formato OOXML Strict."""
     try:
-        with zipfile.ZipFile(BytesIO(file_bytes)) as zf:
+        with zipfile.ZipFile(_excel_stream(file_bytes)) as zf:
             if "xl/workbook.xml" in zf.namelist():
                 content = zf.read("xl/workbook.xml").decode("utf-8", errors="ignore")
                 return "purl.oclc.org/ooxml" in content
@@ -785,6 +1229,46 @@ def _is_strict_ooxml(file_bytes: bytes) -> bool:
     return False
 
 
+class TransaccionRecord(NamedTuple):
+    """Movimiento extraído de un auxiliar o de un archivo macro"""
+    cuenta_contable: str
+    nombre_cuenta: str
+    fecha: str
+    poliza: str
+    beneficiario: str
+    descripcion: str
+    orden_pago: str
+    saldo_inicial: str
+    cargos: str
+    abonos: str
+    saldo_final: str
+    periodo_inicio: str
+    orden_auxiliar: int
+
+
+def _records_frame(records):
+    # Los registros se transponen a columnas: sin un dict por fila ni
+    # búsquedas de llave al construir el DataFrame.
+    return _record_columns_frame(zip(*records))
+
+
+def _record_columns_frame(columns):
+    """DataFrame de movimientos a partir de sus columnas, en el orden de TransaccionRecord"""
+    # Las columnas de texto usan el mismo dtype que la hoja leída (Arrow
+    # cuando pyarrow está instalado).
+    return pd.DataFrame(
+        {
+            column: (
+                list(values)
+                if column == "orden_auxiliar"
+                else pd.Series(values, dtype=RAW_TEXT_DTYPE)
+            )
+            for column, values in zip(TransaccionRecord._fields, columns)
+        },
+        columns=list(TransaccionRecord._fields),
+    )
+
+
 def _read_one_excel(file_data):
     """Lee un archivo Excel y extrae las transacciones"""
     filename, file_content = file_data
@@ -792,7 +1276,7 @@ def _read_one_excel(file_data):
     file_content.seek(0)
 
     try:
-        raw_bytes = file_content.read()
+        raw_bytes = _read_excel_source(file_content)
         is_strict = _is_strict_ooxml(raw_bytes)
         raw = None
 
@@ -801,7 +1285,7 @@ def _read_one_excel(file_data):
                 f"Detectado formato OOXML Strict en {filename}, "
                 "usando lector XML optimizado..."
             )
-            raw = _read_xlsx_xml_to_dataframe(BytesIO(raw_bytes))
+            raw = _read_xlsx_xml_to_dataframe(_excel_stream(raw_bytes))
 
         if raw is None:
             read_bytes = raw_bytes
@@ -811,44 +1295,48 @@ def _read_one_excel(file_data):
                     "para compatibilidad con openpyxl..."
                 )
                 read_bytes = _convert_strict_ooxml(raw_bytes)
-            raw = pd.read_excel(BytesIO(read_bytes), header=None, dtype=str, engine="openpyxl")
+            raw = _read_xlsx_calamine(read_bytes, filename)
+            if raw is None:
+                raw = _read_xlsx_text_frame(read_bytes)
 
         logger.info(f"Archivo leído exitosamente: {filename} ({len(raw)} filas)")
     except Exception as e:
-        logger.error(f"Error al leer archivo {filename}: {type(e).__name__} - {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error(
+            "Error al leer archivo %s: %s - %s", filename, type(e).__name__, e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return pd.DataFrame(), filename
 
     if raw.empty or len(raw) < 2:
         logger.warning(f"Archivo vacío o muy pequeño: {filename} ({len(raw)} filas)")
         return pd.DataFrame(), filename
 
+    # Las celdas se convierten a texto una sola vez (arreglo 2-D): la búsqueda
+    # de encabezados y el recorrido trabajan sobre filas de este arreglo, sin
+    # crear una Series por fila ni por celda.
+    cell_values = raw.fillna("").astype(str).to_numpy(dtype=object)
+
     # Buscar la fila de encabezados
-    header_row_idx = None
-    for idx in range(min(20, len(raw))):
-        row_text = _norm(" ".join(raw.iloc[idx].fillna("").astype(str)))
-        if "fecha" in row_text and ("poliza" in row_text or "saldo" in row_text):
-            header_row_idx = idx
-            logger.info(f"Encabezado encontrado en fila {idx} de {filename}")
-            break
+    head_texts = _join_row_texts(cell_values[:20]).map(_norm)
+    header_row_idx = _first_matching_row(head_texts, ["fecha"], ["poliza", "saldo"])
+    if header_row_idx is not None:
+        logger.info(f"Encabezado encontrado en fila {header_row_idx} de {filename}")
 
     if header_row_idx is None:
         logger.warning(f"No se encontró fila de encabezados en {filename}. Primeras 5 filas:")
         for i in range(min(5, len(raw))):
             logger.warning(
-                f"  Fila {i}: {' | '.join(raw.iloc[i].fillna('').astype(str).tolist()[:5])}"
+                f"  Fila {i}: {' | '.join(cell_values[i].tolist()[:5])}"
             )
         return pd.DataFrame(), filename
 
     # Saltar las filas de encabezado
     start_idx = header_row_idx + 1
-    next_row_text = " ".join(
-        raw.iloc[start_idx].fillna("").astype(str).str.lower()
-    ) if start_idx < len(raw) else ""
+    next_row_text = " ".join(cell_values[start_idx].tolist()).lower() if start_idx < len(raw) else ""
     if "beneficiario" in next_row_text or "descripcion" in next_row_text or "no." in next_row_text:
         start_idx += 1
 
-    fixed_layout = _detect_fixed_auxiliar_layout(raw, header_row_idx)
+    fixed_layout = _detect_fixed_auxiliar_layout(cell_values[header_row_idx])
     if fixed_layout:
         _pos_benef = fixed_layout["beneficiario"]
         _pos_desc = fixed_layout["descripcion"]
@@ -865,18 +1353,14 @@ def _read_one_excel(file_data):
         )
     else:
         # --- Position-based column mapping from header row ---
-        header_cells = raw.iloc[header_row_idx].fillna("").astype(str)
         _hdr_map = {}
-        for _ci in range(len(header_cells)):
-            _cn = header_cells.iloc[_ci]
-            if str(_cn).strip():
+        for _ci, _cn in enumerate(cell_values[header_row_idx].tolist()):
+            if _cn.strip():
                 _hdr_map[_ci] = _cn
         # Also merge sub-header row (beneficiario, descripcion)
         if start_idx == header_row_idx + 2:
-            sub_cells = raw.iloc[header_row_idx + 1].fillna("").astype(str)
-            for _ci in range(len(sub_cells)):
-                _cn = sub_cells.iloc[_ci]
-                if str(_cn).strip() and _ci not in _hdr_map:
+            for _ci, _cn in enumerate(cell_values[header_row_idx + 1].tolist()):
+                if _cn.strip() and _ci not in _hdr_map:
                     _hdr_map[_ci] = _cn
 
         def _find_hdr_pos(options):
@@ -900,65 +1384,125 @@ def _read_one_excel(file_data):
                 f"op=col{_pos_op} si=col{_pos_si} sf=col{_pos_sf}"
             )
 
-    # Procesar todas las filas
-    records = []
-    current_cuenta = None
-    current_nombre = None
-    current_saldo_inicial = None
-    current_period_start = ""
-
-    for idx in range(start_idx, len(raw)):
-        row = raw.iloc[idx]
-        first_col = str(row.iloc[0] if not pd.isna(row.iloc[0]) else "").strip()
-
-        # Detectar línea de cuenta contable
-        if "CUENTA CONTABLE:" in first_col.upper():
-            parts = first_col.split(":", 1)
-            if len(parts) > 1:
-                cuenta_nombre = parts[1].strip()
-                if " - " in cuenta_nombre:
-                    current_cuenta, current_nombre = cuenta_nombre.split(" - ", 1)
-                    current_cuenta = current_cuenta.strip()
-                    current_nombre = current_nombre.strip()
-                else:
-                    current_cuenta = cuenta_nombre
-                    current_nombre = ""
-            current_saldo_inicial = None
-            current_period_start = ""
-            continue
-
-        # Detectar línea de saldo inicial
-        row_text_full = " ".join(row.fillna("").astype(str))
-        row_text_upper = row_text_full.upper()
-        if "SALDO INICIAL CUENTA" in row_text_upper and current_cuenta:
-            period_start = _extract_period_start(row_text_full)
-            if period_start:
-                current_period_start = period_start
-            for col_idx in range(len(row)):
-                val = str(row.iloc[col_idx] if not pd.isna(row.iloc[col_idx]) else "").strip()
-                if val and any(c.isdigit() for c in val):
-                    test_val = val.replace(",", "").replace(".", "").replace("-", "")
-                    if test_val.replace(".", "").isdigit() or test_val.replace(".", "").replace("-", "").isdigit():
-                        current_saldo_inicial = val
-                        break
-            continue
-
-        # Ignorar filas vacías y totales
-        if row.isna().all():
-            continue
-        row_text = " ".join(row.fillna("").astype(str)).lower()
-        if any(skip in row_text for skip in ["saldo acumulado", "saldo final cuenta"]):
-            continue
+    # Procesar todas las filas sobre el arreglo de texto ya convertido
+    n_cols = raw.shape[1]
+    first_values = raw.iloc[:, 0].to_numpy(dtype=object)
+    empty_rows = raw.isna().all(axis=1).to_numpy()
+    row_cells = cell_values.tolist()
+    # Los marcadores se buscan una sola vez sobre toda la hoja. El texto de cada
+    # fila se arma una vez y de él salen la versión en mayúsculas y en
+    # minúsculas, sin guardar copias de la hoja completa.
+    row_texts = _join_row_texts(cell_values).tolist()
+    n_rows = len(row_texts)
+    # Sin ":" la celda no puede contener el marcador: se descarta sin upper()
+    cuenta_rows = np.fromiter(
+        (":" in cell and "CUENTA CONTABLE:" in cell.upper() for cell in cell_values[:, 0]),
+        dtype=bool,
+        count=n_rows,
+    )
+    saldo_inicial_rows = np.fromiter(
+        ("SALDO INICIAL CUENTA" in text.upper() for text in row_texts), dtype=bool, count=n_rows
+    )
+    skip_rows = np.fromiter(
+        (
+            "saldo acumulado" in text or "saldo final cuenta" in text
+            for text in map(str.lower, row_texts)
+        ),
+        dtype=bool,
+        count=n_rows,
+    )
 
-        if not current_cuenta:
-            continue
+    # Las fechas ISO (las que openpyxl entrega para celdas de fecha) se parsean
+    # de una vez; el resto pasa por la validación individual del recorrido.
+    fechas_vistas = {
+        fecha_raw: (True, fecha)
+        for fecha_raw, fecha in _parse_iso_fechas(first_values[start_idx:]).items()
+    }
 
-        # Extraer datos de transacción
-        try:
-            fecha_raw = row.iloc[0] if not pd.isna(row.iloc[0]) else None
-            if fecha_raw is None or pd.isna(fecha_raw):
-                continue
+    # Filtro previo: solo se recorren las filas marcadoras (cuenta y saldo
+    # inicial, que cambian el estado) y las que pueden ser movimiento. Las
+    # vacías, los totales y las que no traen nada en la primera columna se
+    # descartan de una vez sobre el arreglo completo.
+    candidate_rows = ~(empty_rows | skip_rows) & ~pd.isna(first_values)
+    if _use_mapped:
+        # Con columnas mapeadas, un movimiento necesita al menos un importe.
+        has_amount = np.zeros(n_rows, dtype=bool)
+        for pos in (_pos_cargos, _pos_abonos, _pos_sf):
+            if pos is not None and pos < n_cols:
+                has_amount |= np.fromiter(
+                    (bool(cell.strip()) for cell in cell_values[:, pos]), dtype=bool, count=n_rows
+                )
+        candidate_rows &= has_amount
+    candidate_rows |= cuenta_rows | saldo_inicial_rows
+    row_indices = np.flatnonzero(candidate_rows[start_idx:]) + start_idx
+
+    # Estado de cada fila candidata (cuenta vigente, saldo inicial y periodo)
+    # calculado de una vez: cada línea de cuenta abre un bloque y el último
+    # saldo inicial visto dentro del bloque se propaga hacia adelante.
+    n_candidates = len(row_indices)
+    positions = np.arange(n_candidates)
+    is_cuenta = cuenta_rows[row_indices]
+    blocks = np.cumsum(is_cuenta) - 1
+
+    # Bloque -1 (antes de la primera cuenta): sin cuenta vigente
+    cuentas = [None]
+    nombres = [None]
+    for idx in row_indices[is_cuenta].tolist():
+        current_cuenta, current_nombre = cuentas[-1], nombres[-1]
+        _, sep, cuenta_nombre = row_cells[idx][0].strip().partition(":")
+        if sep:
+            cuenta_nombre = cuenta_nombre.strip()
+            current_cuenta, sep, current_nombre = cuenta_nombre.partition(" - ")
+            if sep:
+                current_cuenta = current_cuenta.strip()
+                current_nombre = current_nombre.strip()
+            # La misma cuenta reaparece en muchos bloques y archivos: los
+            # registros comparten una sola copia de cada texto.
+            current_cuenta = sys.intern(current_cuenta)
+            current_nombre = sys.intern(current_nombre)
+        cuentas.append(current_cuenta)
+        nombres.append(current_nombre)
+    block_cuentas = np.array(cuentas, dtype=object)
+    block_nombres = np.array(nombres, dtype=object)
+    in_account = np.fromiter(map(bool, cuentas), dtype=bool, count=len(cuentas))[blocks + 1]
+
+    # Líneas de saldo inicial dentro de una cuenta: fijan el periodo y el
+    # importe vigentes hasta la siguiente línea de cuenta.
+    is_saldo = saldo_inicial_rows[row_indices]
+    saldo_values = np.full(n_candidates, None, dtype=object)
+    period_values = np.full(n_candidates, None, dtype=object)
+    for pos in np.flatnonzero(is_saldo & ~is_cuenta & in_account).tolist():
+        idx = int(row_indices[pos])
+        period_start = _extract_period_start(row_texts[idx])
+        if period_start:
+            period_values[pos] = period_start
+        for cell in row_cells[idx]:
+            val = cell.strip()
+            # Importe: solo dígitos una vez quitados separadores y signo
+            if val.translate(_AMOUNT_PUNCTUATION).isdigit():
+                saldo_values[pos] = val
+                break
 
+    def _carry_forward(values, empty):
+        # Último valor asignado en la misma cuenta hasta cada fila (o `empty`)
+        last = np.maximum.accumulate(np.where(pd.notna(values), positions, -1))
+        carried = np.where(last >= 0, values[np.maximum(last, 0)], empty)
+        carried[(last >= 0) & (blocks[np.maximum(last, 0)] != blocks)] = empty
+        return carried
+
+    current_saldos = _carry_forward(saldo_values, None)
+    current_periods = _carry_forward(period_values, "")
+
+    # Movimientos: filas dentro de una cuenta que no son marcadores, vacías ni
+    # totales y cuya primera columna es una fecha.
+    is_movement = in_account & ~is_cuenta & ~is_saldo
+    is_movement &= ~(empty_rows[row_indices] | skip_rows[row_indices])
+
+    def _fecha_movimiento(fecha_raw):
+        # Las mismas fechas se repiten en miles de filas: cada valor
+        # distinto se valida y formatea una sola vez.
+        cached_fecha = fechas_vistas.get(fecha_raw)
+        if cached_fecha is None:
             fecha = str(fecha_raw).strip()
             is_date = False
             if "/" in fecha or "-" in fecha:
@@ -970,146 +1514,223 @@ def _read_one_excel(file_data):
                 except Exception:
                     pass
 
-            if not is_date:
-                continue
-
-            try:
-                fecha = pd.to_datetime(fecha_raw).strftime("%d/%m/%Y")
-            except Exception:
-                pass
-
-            poliza = str(row.iloc[1] if len(row) > 1 and not pd.isna(row.iloc[1]) else "").strip()
-
-            def _cell(ci):
-                if ci is None or ci >= len(row):
-                    return ""
-                v = row.iloc[ci]
-                return "" if pd.isna(v) else str(v).strip()
-
-            if _use_mapped:
-                # ── Position-based extraction (reliable) ──
-                beneficiario = _cell(_pos_benef)
-                descripcion = _cell(_pos_desc)
-                op = _cell(_pos_op)
-                saldo_inicial = _cell(_pos_si) or (current_saldo_inicial if current_saldo_inicial else "")
-                cargos = _cell(_pos_cargos)
-                abonos = _cell(_pos_abonos)
-                saldo_final = _cell(_pos_sf)
-
-                # Need at least one non-empty monetary value
-                if not cargos and not abonos and not saldo_final:
-                    continue
-            else:
-                # ── Heuristic-based extraction (fallback) ──
-                col_data = []
-                for i in range(2, min(len(row), 15)):
-                    val = _cell(i)
-                    col_data.append({
-                        'idx': i,
-                        'value': val,
-                        'is_empty': not val,
-                        'is_numeric': False,
-                        'is_monetary': False,
-                        'numeric_value': None
-                    })
-
-                    if val:
-                        cleaned = val.replace(",", "").replace(" ", "")
-                        try:
-                            num_val = float(cleaned)
-                            col_data[-1]['is_numeric'] = True
-                            col_data[-1]['numeric_value'] = num_val
-                            has_comma = "," in val
-                            has_decimal = "." in cleaned
-                            is_zero_str = val.strip() == "0"
-
-                            if has_comma or has_decimal or is_zero_str:
-                                col_data[-1]['is_monetary'] = True
-                        except ValueError:
-                            pass
-
-                # Separar columnas
-                text_cols = []
-                op_col = None
-                monetary_cols = []
-
-                for col in col_data:
-                    if col['is_empty']:
-                        continue
-                    elif col['is_monetary']:
-                        monetary_cols.append(col)
-                    elif col['is_numeric'] and not col['is_monetary']:
-                        if op_col is None and col['numeric_value'] and col['numeric_value'].is_integer():
-                            op_col = col
-                        else:
-                            monetary_cols.append(col)
-                    else:
-                        text_cols.append(col)
-
-                if len(monetary_cols) < 2:
-                    continue
-
-                # Extraer campos de texto
-                beneficiario = ""
-                descripcion = ""
-                if len(text_cols) >= 2:
-                    beneficiario = text_cols[0]['value']
-                    descripcion = " ".join([c['value'] for c in text_cols[1:]])
-                elif len(text_cols) == 1:
-                    descripcion = text_cols[0]['value']
-
-                op = op_col['value'] if op_col else ""
-
-                # Determinar columnas monetarias
-                if len(monetary_cols) >= 4:
-                    saldo_inicial = monetary_cols[0]['value']
-                    cargos = monetary_cols[1]['value']
-                    abonos = monetary_cols[2]['value']
-                    saldo_final = monetary_cols[3]['value']
-                elif len(monetary_cols) == 3:
-                    saldo_inicial = current_saldo_inicial if current_saldo_inicial else ""
-                    cargos = monetary_cols[0]['value']
-                    abonos = monetary_cols[1]['value']
-                    saldo_final = monetary_cols[2]['value']
-                elif len(monetary_cols) == 2:
-                    saldo_inicial = current_saldo_inicial if current_saldo_inicial else ""
-                    cargos = ""
-                    abonos = monetary_cols[0]['value']
-                    saldo_final = monetary_cols[1]['value']
-                else:
-                    continue
-
-            # Crear registro
-            record = {
-                "cuenta_contable": current_cuenta,
-                "nombre_cuenta": current_nombre,
-                "fecha": fecha,
-                "poliza": poliza,
-                "beneficiario": beneficiario,
-                "descripcion": descripcion,
-                "orden_pago": op,
-                "saldo_inicial": saldo_inicial,
-                "cargos": cargos,
-                "abonos": abonos,
-                "saldo_final": saldo_final,
-                "periodo_inicio": current_period_start or fecha,
-                "orden_auxiliar": idx,
-            }
-            records.append(record)
-        except Exception:
-            logger.debug(f"Error procesando fila {idx} en {filename}")
-            continue
+            if is_date:
+                fecha = _format_fecha(fecha_raw, {})
+            cached_fecha = fechas_vistas[fecha_raw] = (is_date, fecha)
+        return cached_fecha
 
-    if not records:
+    movement_positions = []
+    fechas = []
+    for pos, fecha_raw in zip(
+        np.flatnonzero(is_movement).tolist(),
+        first_values[row_indices[is_movement]].tolist(),
+    ):
+        is_date, fecha = _fecha_movimiento(fecha_raw)
+        if is_date:
+            movement_positions.append(pos)
+            fechas.append(fecha)
+    movement_positions = np.array(movement_positions, dtype=np.intp)
+    movement_rows = row_indices[movement_positions]
+
+    df = None
+    if _use_mapped and len(movement_rows):
+        # ── Position-based extraction (reliable) ──
+        # Cada campo se toma como columna completa de las filas de movimiento;
+        # el filtro previo ya garantizó al menos un importe por fila.
+        def _column(ci):
+            if ci is None or ci >= n_cols:
+                return [""] * len(movement_rows)
+            return [cell.strip() for cell in cell_values[movement_rows, ci].tolist()]
+
+        saldos_vigentes = current_saldos[movement_positions].tolist()
+        periodos_vigentes = current_periods[movement_positions].tolist()
+        df = _record_columns_frame([
+            block_cuentas[blocks[movement_positions] + 1].tolist(),
+            block_nombres[blocks[movement_positions] + 1].tolist(),
+            fechas,
+            _column(1),
+            _column(_pos_benef),
+            _column(_pos_desc),
+            _column(_pos_op),
+            [
+                value or (saldo if saldo else "")
+                for value, saldo in zip(_column(_pos_si), saldos_vigentes)
+            ],
+            _column(_pos_cargos),
+            _column(_pos_abonos),
+            _column(_pos_sf),
+            [period or fecha for period, fecha in zip(periodos_vigentes, fechas)],
+            movement_rows.tolist(),
+        ])
+    elif not _use_mapped and len(movement_rows) and n_cols > 2:
+        # ── Heuristic-based extraction (fallback) ──
+        # Las columnas 2..14 de todos los movimientos se clasifican de una vez:
+        # cada valor distinto se analiza una sola vez y cada fila se reparte en
+        # texto, O.P. e importes con máscaras sobre la matriz completa.
+        body = cell_values[movement_rows, 2:min(n_cols, 15)]
+        codes, uniques = pd.factorize(body.ravel(), use_na_sentinel=False)
+        valores = [value.strip() for value in uniques.tolist()]
+        textos = np.array(valores, dtype=object)[codes].reshape(body.shape)
+        kinds = np.array([_auxiliar_cell_kind(value) for value in valores], dtype=np.int8)[codes].reshape(body.shape)
+
+        n_movements = len(movement_rows)
+        rows = np.arange(n_movements)
+        # La primera candidata a O.P. de la fila es la O.P.; las demás son importes
+        is_op = kinds == AUX_CELL_OP
+        has_op = is_op.any(axis=1)
+        op_pos = is_op.argmax(axis=1)
+        is_money = (kinds == AUX_CELL_MONEY) | (is_op & (np.arange(body.shape[1]) != op_pos[:, None]))
+        is_text = kinds == AUX_CELL_TEXT
+        n_money = is_money.sum(axis=1)
+        n_text = is_text.sum(axis=1)
+
+        def _nth(mask, counts, k):
+            # k-ésimo valor marcado de cada fila, "" si la fila tiene menos
+            pos = (mask & (np.cumsum(mask, axis=1) == k + 1)).argmax(axis=1)
+            return np.where(counts > k, textos[rows, pos], "")
+
+        m0, m1, m2, m3 = (_nth(is_money, n_money, k) for k in range(4))
+        saldos_vigentes = np.array(
+            [saldo if saldo else "" for saldo in current_saldos[movement_positions].tolist()], dtype=object
+        )
+        # 4+ importes: saldo inicial, cargos, abonos y saldo final; con 3 el saldo
+        # inicial es el vigente de la cuenta; con 2 solo hay abonos y saldo final.
+        four, three = n_money >= 4, n_money == 3
+        saldo_inicial = np.where(four, m0, saldos_vigentes)
+        cargos = np.select([four, three], [m1, m0], "")
+        abonos = np.select([four, three], [m2, m1], m0)
+        saldo_final = np.select([four, three], [m3, m2], m1)
+
+        t0, t1 = _nth(is_text, n_text, 0), _nth(is_text, n_text, 1)
+        beneficiario = np.where(n_text >= 2, t0, "")
+        descripcion = np.where(n_text >= 2, t1, t0)
+        for pos in np.flatnonzero(n_text > 2).tolist():
+            descripcion[pos] = " ".join(textos[pos, is_text[pos]][1:].tolist())
+        op = np.where(has_op, textos[rows, op_pos], "")
+        poliza = np.array([cell.strip() for cell in cell_values[movement_rows, 1].tolist()], dtype=object)
+
+        # Un movimiento necesita al menos dos importes
+        keep = np.flatnonzero(n_money >= 2)
+        if len(keep):
+            fechas_kept = np.array(fechas, dtype=object)[keep].tolist()
+            kept_positions = movement_positions[keep]
+            df = _record_columns_frame([
+                block_cuentas[blocks[kept_positions] + 1].tolist(),
+                block_nombres[blocks[kept_positions] + 1].tolist(),
+                fechas_kept,
+                poliza[keep].tolist(),
+                beneficiario[keep].tolist(),
+                descripcion[keep].tolist(),
+                op[keep].tolist(),
+                saldo_inicial[keep].tolist(),
+                cargos[keep].tolist(),
+                abonos[keep].tolist(),
+                saldo_final[keep].tolist(),
+                [
+                    period or fecha
+                    for period, fecha in zip(current_periods[kept_positions].tolist(), fechas_kept)
+                ],
+                movement_rows[keep].tolist(),
+            ])
+
+    if df is None:
         logger.warning(f"No se encontraron transacciones válidas en {filename}")
         logger.warning(f"Total de filas procesadas: {len(raw) - start_idx}")
         return pd.DataFrame(), filename
 
-    df = pd.DataFrame(records)
     logger.info(f"✓ Extraídas {len(df)} transacciones de {filename}")
     return df, filename
 
 
+# Textos que read_excel interpreta como vacíos (na_values por defecto de pandas)
+EXCEL_NA_TEXTS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+# Las hojas se leen como texto. Con pyarrow las celdas quedan en buffers Arrow
+# (menos memoria que un str de Python por celda y operaciones .str en C); sin
+# él, o con un pandas sin na_value en StringDtype, se usa el str de siempre.
+RAW_TEXT_DTYPE = str
+if pyarrow is not None:
+    try:
+        RAW_TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        pass
+
+
+def _read_xlsx_calamine(file_bytes, filename):
+    """read_excel(header=None, dtype=str) con el motor calamine, si está instalado"""
+    if python_calamine is None:
+        return None
+    try:
+        return pd.read_excel(_excel_stream(file_bytes), header=None, dtype=RAW_TEXT_DTYPE, engine="calamine")
+    except Exception as exc:
+        logger.warning(f"calamine no pudo leer {filename}, se usa openpyxl: {exc}")
+        return None
+
+
+def _open_excel_file(file_bytes, filename):
+    if python_calamine is not None:
+        try:
+            return pd.ExcelFile(_excel_stream(file_bytes), engine="calamine")
+        except Exception as exc:
+            logger.warning(f"calamine no pudo abrir {filename}, se usa openpyxl: {exc}")
+    return pd.ExcelFile(_excel_stream(file_bytes), engine="openpyxl")
+
+
+def _read_xlsx_text_frame(file_bytes):
+    """Equivale a read_excel(header=None, dtype=str) de la primera hoja"""
+    # Las filas se recorren en streaming (read_only) y cada celda se convierte
+    # a texto directamente, sin pasar por el parser de texto de pandas.
+    workbook = load_workbook(_excel_stream(file_bytes), read_only=True, data_only=True, keep_links=False)
+    try:
+        if not workbook.worksheets:
+            raise ValueError("El libro no contiene hojas de cálculo")
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        rows = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(sheet.rows):
+            # Una sola pasada por celda: la misma conversión que el lector
+            # openpyxl de pandas (errores como vacío, enteros sin ".0"), el
+            # texto (None para vacíos y textos NA) y el ancho sin las celdas
+            # vacías del final.
+            texts = []
+            width = 0
+            for cell in row:
+                value = cell.value
+                if value is None or value == "":
+                    texts.append(None)
+                    continue
+                data_type = cell.data_type
+                if data_type == TYPE_ERROR:
+                    value = None
+                else:
+                    if data_type == TYPE_NUMERIC:
+                        as_int = int(value)
+                        value = as_int if as_int == value else float(value)
+                    value = str(value)
+                    if value in EXCEL_NA_TEXTS:
+                        value = None
+                texts.append(value)
+                width = len(texts)
+            del texts[width:]
+            if width:
+                last_row_with_data = row_number
+            rows.append(texts)
+    finally:
+        workbook.close()
+
+    rows = rows[:last_row_with_data + 1]
+    width = max((len(row) for row in rows), default=0)
+    return pd.DataFrame(
+        [row + [None] * (width - len(row)) for row in rows],
+        columns=range(width),
+        dtype=RAW_TEXT_DTYPE,
+    )
+
+
 def _select_column(col_map, options):
     for option in options:
         option_norm = _norm(option)
@@ -1161,6 +1782,91 @@ def _estimate_stream_size(file_obj):
         return 0
 
 
+def _map_input_file(path):
+    # mmap de solo lectura: el lector pagina el archivo bajo demanda en lugar
+    # de mantener una copia completa en un BytesIO durante todo el trabajo.
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return BytesIO()
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_excel_payload(reader, filename, payload):
+    """Punto de entrada en el proceso lector: reconstruye el stream desde bytes"""
+    return reader((filename, BytesIO(payload)))
+
+
+# Pools de lectura reutilizados entre cargas (se crean al primer uso). Un
+# proceso "spawn" arranca un intérprete e importa pandas y openpyxl: con un
+# pool compartido ese costo se paga una vez y no en cada carga.
+_reader_thread_pool = None
+_reader_thread_pool_workers = 0
+_reader_process_pool = None
+_reader_process_pool_workers = 0
+_reader_pool_lock = threading.Lock()
+
+
+def _shared_reader_thread_pool(worker_count):
+    global _reader_thread_pool, _reader_thread_pool_workers
+    with _reader_pool_lock:
+        # El tamaño sigue a max_workers (y al recorte por archivos grandes):
+        # con otro tamaño se crea un pool nuevo.
+        if _reader_thread_pool is None or _reader_thread_pool_workers != worker_count:
+            if _reader_thread_pool is not None:
+                # Las lecturas ya enviadas por otra carga terminan igual
+                _reader_thread_pool.shutdown(wait=False)
+            _reader_thread_pool = ThreadPoolExecutor(
+                max_workers=worker_count,
+                thread_name_prefix="xlsx",
+            )
+            _reader_thread_pool_workers = worker_count
+    return _reader_thread_pool
+
+
+def _shared_reader_process_pool(worker_count):
+    global _reader_process_pool, _reader_process_pool_workers
+    with _reader_pool_lock:
+        # Un pool roto entre cargas (un proceso terminado por el sistema) se
+        # reemplaza antes de usarlo; _broken es el indicador del propio executor.
+        if (
+            _reader_process_pool is None
+            or _reader_process_pool_workers < worker_count
+            or getattr(_reader_process_pool, "_broken", False)
+        ):
+            if _reader_process_pool is not None:
+                # Las lecturas en curso de otra carga terminan antes de cerrarlo
+                _reader_process_pool.shutdown(wait=False)
+            _reader_process_pool = ProcessPoolExecutor(
+                max_workers=worker_count,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _reader_process_pool_workers = worker_count
+    return _reader_process_pool
+
+
+def _discard_reader_process_pool(pool):
+    """Descarta el pool de procesos compartido si se rompió (un lector terminó abruptamente)"""
+    global _reader_process_pool, _reader_process_pool_workers
+    with _reader_pool_lock:
+        if _reader_process_pool is pool:
+            _reader_process_pool = None
+            _reader_process_pool_workers = 0
+    pool.shutdown(wait=False)
+
+
+def _create_reader_executor(worker_count, total_input_bytes):
+    """Crea el pool de lectura; devuelve (executor, usa_procesos)"""
+    # Leer Excel es CPU pura y retiene el GIL: con varios archivos cada uno se
+    # lee en su propio proceso. "spawn" evita heredar hilos y conexiones del worker web;
+    # por debajo de ~1 MB arrancar los procesos cuesta más que la lectura.
+    if worker_count > 1 and total_input_bytes >= 1024 * 1024:
+        try:
+            return _shared_reader_process_pool(worker_count), True
+        except (OSError, NotImplementedError, ValueError) as exc:
+            logger.warning("No se pudo crear el pool de procesos, se usan hilos: %s", exc)
+    return _shared_reader_thread_pool(worker_count), False
+
+
 def _extract_xlsx_shared_strings(zip_file):
     if "xl/sharedStrings.xml" not in zip_file.namelist():
         return []
@@ -1253,9 +1959,9 @@ def _get_xlsx_sheet_candidates(zip_file):
         [
             name
             for name in zip_file.namelist()
-            if re.fullmatch(r"xl/worksheets/sheet\d+\.xml", name)
+            if _WORKSHEET_PART_RE.fullmatch(name)
         ],
-        key=lambda name: int(re.search(r"sheet(\d+)\.xml$", name).group(1))
+        key=lambda name: int(_SHEET_NUMBER_RE.search(name).group(1))
     )
 
 
@@ -1273,21 +1979,27 @@ def _read_xlsx_xml_sheet_frames(file_content):
     shared = _extract_xlsx_shared_strings(z)
 
     for sheet_path in sheet_candidates:
-        row_dicts = []
+        sheet_rows = []
         max_col_idx = 0
 
         try:
             for cells, current_max_col_idx in _iter_xlsx_sheet_rows(z, sheet_path, shared):
-                row_dicts.append({idx - 1: value for idx, value in cells.items()})
+                sheet_rows.append(cells)
                 max_col_idx = max(max_col_idx, current_max_col_idx)
         except Exception:
             continue
 
-        if not row_dicts or max_col_idx == 0:
+        if not sheet_rows or max_col_idx == 0:
             continue
 
-        frame = pd.DataFrame.from_records(row_dicts)
-        frame = frame.reindex(columns=range(max_col_idx), fill_value="").fillna("")
+        # Filas densas (listas) con "" en las celdas ausentes: sin un dict por
+        # fila que from_records tenga que alinear columna por columna.
+        columns = range(1, max_col_idx + 1)
+        frame = pd.DataFrame(
+            [[cells.get(col, "") for col in columns] for cells in sheet_rows],
+            columns=range(max_col_idx),
+            dtype=object,
+        )
         yield sheet_path, frame.astype(str)
 
 
@@ -1299,13 +2011,14 @@ def _read_xlsx_xml_to_dataframe(file_content):
 
 def _read_one_excel_macro_xml(zip_file, sheet_path, shared_strings, filename):
     def _clean_cell(value):
-        if pd.isna(value):
+        if _is_missing(value):
             return ""
         return str(value).strip()
 
     header_positions = None
     periodo_inicio_base = ""
     records = []
+    fechas_vistas = {}
 
     for row_number, (cells, current_max_col_idx) in enumerate(
         _iter_xlsx_sheet_rows(zip_file, sheet_path, shared_strings),
@@ -1357,13 +2070,10 @@ def _read_one_excel_macro_xml(zip_file, sheet_path, shared_strings, filename):
             continue
 
         fecha_raw = cells.get(fecha_pos, "")
-        if pd.isna(fecha_raw) or str(fecha_raw).strip() == "":
+        if _is_missing(fecha_raw) or str(fecha_raw).strip() == "":
             continue
 
-        try:
-            fecha = pd.to_datetime(fecha_raw).strftime("%d/%m/%Y")
-        except Exception:
-            fecha = _clean_cell(fecha_raw)
+        fecha = _format_fecha(fecha_raw, fechas_vistas)
 
         if not periodo_inicio_base:
             periodo_inicio_base = fecha
@@ -1374,21 +2084,21 @@ def _read_one_excel_macro_xml(zip_file, sheet_path, shared_strings, filename):
             cuenta_val = parts[0].strip()
             nombre_val = parts[1].strip()
 
-        records.append({
-            "cuenta_contable": cuenta_val,
-            "nombre_cuenta": nombre_val,
-            "fecha": fecha,
-            "poliza": _clean_cell(cells.get(header_positions.get("poliza"), "")),
-            "beneficiario": _clean_cell(cells.get(header_positions.get("beneficiario"), "")),
-            "descripcion": _clean_cell(cells.get(header_positions.get("descripcion"), "")),
-            "orden_pago": _clean_cell(cells.get(header_positions.get("op"), "")),
-            "saldo_inicial": _clean_cell(cells.get(header_positions.get("saldo_inicial"), "")),
-            "cargos": _clean_cell(cells.get(header_positions.get("cargos"), "")),
-            "abonos": _clean_cell(cells.get(header_positions.get("abonos"), "")),
-            "saldo_final": _clean_cell(cells.get(header_positions.get("saldo_final"), "")),
-            "periodo_inicio": periodo_inicio_base or fecha,
-            "orden_auxiliar": len(records),
-        })
+        records.append(TransaccionRecord(
+            cuenta_contable=cuenta_val,
+            nombre_cuenta=nombre_val,
+            fecha=fecha,
+            poliza=_clean_cell(cells.get(header_positions.get("poliza"), "")),
+            beneficiario=_clean_cell(cells.get(header_positions.get("beneficiario"), "")),
+            descripcion=_clean_cell(cells.get(header_positions.get("descripcion"), "")),
+            orden_pago=_clean_cell(cells.get(header_positions.get("op"), "")),
+            saldo_inicial=_clean_cell(cells.get(header_positions.get("saldo_inicial"), "")),
+            cargos=_clean_cell(cells.get(header_positions.get("cargos"), "")),
+            abonos=_clean_cell(cells.get(header_positions.get("abonos"), "")),
+            saldo_final=_clean_cell(cells.get(header_positions.get("saldo_final"), "")),
+            periodo_inicio=periodo_inicio_base or fecha,
+            orden_auxiliar=len(records),
+        ))
 
         if records and len(records) % 50000 == 0:
             logger.info(
@@ -1401,7 +2111,7 @@ def _read_one_excel_macro_xml(zip_file, sheet_path, shared_strings, filename):
     if not records:
         return None
 
-    return pd.DataFrame(records)
+    return _records_frame(records)
 
 
 def _read_one_excel_macro(file_data):
@@ -1415,21 +2125,20 @@ def _read_one_excel_macro(file_data):
             return None
 
         def _clean_cell(value):
-            if pd.isna(value):
+            if _is_missing(value):
                 return ""
             return str(value).strip()
 
-        header_row_idx = None
-        for idx in range(min(30, len(raw))):
-            row_text = " ".join(raw.iloc[idx].fillna("").astype(str).str.lower())
-            if "cuenta" in row_text and "fecha" in row_text and ("poliza" in row_text or "póliza" in row_text):
-                header_row_idx = idx
-                break
+        # Las primeras filas se pasan a texto una sola vez: de ellas salen la
+        # búsqueda del encabezado y los nombres de columna.
+        head_values = raw.head(30).fillna("").astype(str).to_numpy(dtype=object)
+        head_texts = _join_row_texts(head_values).str.lower()
+        header_row_idx = _first_matching_row(head_texts, ["cuenta", "fecha"], ["poliza", "póliza"])
 
         if header_row_idx is None:
             return None
 
-        headers = _unique_headers(raw.iloc[header_row_idx].fillna("").astype(str).tolist())
+        headers = _unique_headers(head_values[header_row_idx].tolist())
         col_map = {col: _norm(col) for col in headers}
 
         data = raw.iloc[header_row_idx + 1:].copy()
@@ -1455,77 +2164,88 @@ def _read_one_excel_macro(file_data):
         saldo_final_col = _select_column(col_map, ["saldo final", "saldo final cuenta", "saldo"])
 
         periodo_inicio_base = ""
+        fechas_vistas = {}
         if fecha_col:
+            # Las fechas ISO de la columna se parsean de una sola vez; el resto
+            # se formatea individualmente (y se cachea) en el recorrido.
+            fechas_vistas = {
+                (str, fecha_raw): fecha
+                for fecha_raw, fecha in _parse_iso_fechas(data[fecha_col].to_numpy(dtype=object)).items()
+            }
             for raw_value in data[fecha_col].tolist():
-                if pd.isna(raw_value) or str(raw_value).strip() == "":
+                if _is_missing(raw_value) or str(raw_value).strip() == "":
                     continue
-                try:
-                    periodo_inicio_base = pd.to_datetime(raw_value).strftime("%d/%m/%Y")
-                except Exception:
-                    periodo_inicio_base = str(raw_value).strip()
+                periodo_inicio_base = _format_fecha(raw_value, fechas_vistas)
                 if periodo_inicio_base:
                     break
 
         records = []
-        for order_idx, (_, row) in enumerate(data.iterrows()):
-            cuenta_val = _clean_cell(row.get(cuenta_col, "")) if cuenta_col else ""
+        # Columnas no encontradas llegan como None y _clean_cell las deja en ""
+        rows = _iter_column_values(
+            data,
+            [
+                cuenta_col, nombre_col, fecha_col, poliza_col, beneficiario_col, descripcion_col,
+                op_col, saldo_inicial_col, cargos_col, abonos_col, saldo_final_col,
+            ],
+        )
+        for order_idx, (
+            cuenta_raw, nombre_raw, fecha_raw, poliza_raw, beneficiario_raw, descripcion_raw,
+            op_raw, saldo_inicial_raw, cargos_raw, abonos_raw, saldo_final_raw,
+        ) in enumerate(rows):
+            cuenta_val = _clean_cell(cuenta_raw)
             if not cuenta_val:
                 continue
 
-            nombre_val = _clean_cell(row.get(nombre_col, "")) if nombre_col else ""
+            nombre_val = _clean_cell(nombre_raw)
             if not nombre_val and " - " in cuenta_val:
                 parts = cuenta_val.split(" - ", 1)
                 cuenta_val = parts[0].strip()
                 nombre_val = parts[1].strip()
 
-            fecha_raw = row.get(fecha_col, "") if fecha_col else ""
-            if pd.isna(fecha_raw) or str(fecha_raw).strip() == "":
+            if _is_missing(fecha_raw) or str(fecha_raw).strip() == "":
                 continue
 
-            try:
-                fecha = pd.to_datetime(fecha_raw).strftime("%d/%m/%Y")
-            except Exception:
-                fecha = _clean_cell(fecha_raw)
-
-            poliza = _clean_cell(row.get(poliza_col, "")) if poliza_col else ""
-            beneficiario = _clean_cell(row.get(beneficiario_col, "")) if beneficiario_col else ""
-            descripcion = _clean_cell(row.get(descripcion_col, "")) if descripcion_col else ""
-            op = _clean_cell(row.get(op_col, "")) if op_col else ""
-            saldo_inicial = _clean_cell(row.get(saldo_inicial_col, "")) if saldo_inicial_col else ""
-            cargos = _clean_cell(row.get(cargos_col, "")) if cargos_col else ""
-            abonos = _clean_cell(row.get(abonos_col, "")) if abonos_col else ""
-            saldo_final = _clean_cell(row.get(saldo_final_col, "")) if saldo_final_col else ""
-
-            records.append({
-                "cuenta_contable": cuenta_val,
-                "nombre_cuenta": nombre_val,
-                "fecha": fecha,
-                "poliza": poliza,
-                "beneficiario": beneficiario,
-                "descripcion": descripcion,
-                "orden_pago": op,
-                "saldo_inicial": saldo_inicial,
-                "cargos": cargos,
-                "abonos": abonos,
-                "saldo_final": saldo_final,
-                "periodo_inicio": periodo_inicio_base or fecha,
-                "orden_auxiliar": order_idx,
-            })
+            fecha = _format_fecha(fecha_raw, fechas_vistas)
+
+            poliza = _clean_cell(poliza_raw)
+            beneficiario = _clean_cell(beneficiario_raw)
+            descripcion = _clean_cell(descripcion_raw)
+            op = _clean_cell(op_raw)
+            saldo_inicial = _clean_cell(saldo_inicial_raw)
+            cargos = _clean_cell(cargos_raw)
+            abonos = _clean_cell(abonos_raw)
+            saldo_final = _clean_cell(saldo_final_raw)
+
+            records.append(TransaccionRecord(
+                cuenta_val,
+                nombre_val,
+                fecha,
+                poliza,
+                beneficiario,
+                descripcion,
+                op,
+                saldo_inicial,
+                cargos,
+                abonos,
+                saldo_final,
+                periodo_inicio_base or fecha,
+                order_idx,
+            ))
 
         if not records:
             return None
 
-        return pd.DataFrame(records)
+        return _records_frame(records)
 
     try:
-        raw_bytes = file_content.read()
+        raw_bytes = _read_excel_source(file_content)
         is_strict = _is_strict_ooxml(raw_bytes)
         if is_strict:
             logger.info(
                 f"Detectado formato OOXML Strict en {filename}, "
                 "usando lector XML optimizado para archivos macro..."
             )
-            with zipfile.ZipFile(BytesIO(raw_bytes)) as zf:
+            with zipfile.ZipFile(_excel_stream(raw_bytes)) as zf:
                 shared = _extract_xlsx_shared_strings(zf)
                 for sheet_path in _get_xlsx_sheet_candidates(zf):
                     logger.info(
@@ -1542,17 +2262,19 @@ def _read_one_excel_macro(file_data):
         if is_strict:
             logger.info(f"Fallback a conversion OOXML Strict en {filename} para openpyxl...")
             raw_bytes = _convert_strict_ooxml(raw_bytes)
-        xl = pd.ExcelFile(BytesIO(raw_bytes), engine="openpyxl")
+        xl = _open_excel_file(raw_bytes, filename)
         sheets = xl.sheet_names
     except Exception as e:
-        logger.error(f"Error al leer archivo macro {filename}: {type(e).__name__} - {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error(
+            "Error al leer archivo macro %s: %s - %s", filename, type(e).__name__, e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         sheets = []
         xl = None
 
     for sheet in sheets:
         try:
-            raw = pd.read_excel(xl, sheet_name=sheet, header=None, dtype=str)
+            raw = pd.read_excel(xl, sheet_name=sheet, header=None, dtype=RAW_TEXT_DTYPE)
         except Exception:
             continue
         df = build_from_raw(raw)
@@ -1571,6 +2293,122 @@ def _read_one_excel_macro(file_data):
     return pd.DataFrame(), filename
 
 
+INSERT_CHUNK_SIZE = 1000
+COPY_CHUNK_SIZE = 20_000
+
+
+COPY_CARGA_COLUMNS = ["lote_id", "usuario_carga", "fecha_carga"] + TRANSACCION_INSERT_COLUMNS
+
+
+def _copy_transacciones_postgres(chunk, lote_id, usuario, connection=None, table="transacciones", first_row=None):
+    """Inserta un bloque de transacciones con COPY FROM STDIN (solo PostgreSQL)"""
+    frame = chunk[TRANSACCION_INSERT_COLUMNS].copy()
+    frame.insert(0, "lote_id", lote_id)
+    frame.insert(1, "usuario_carga", usuario)
+    frame.insert(2, "fecha_carga", datetime.utcnow())
+    if first_row is not None:
+        # Posición en la carga: la tabla de paso se vuelca en este orden
+        frame["fila_carga"] = np.arange(first_row, first_row + len(frame))
+    # strftime una sola vez por fecha distinta; NaT queda como NULL
+    codes, fechas = pd.factorize(pd.to_datetime(frame["fecha_transaccion"]))
+    fecha_textos = np.array([fecha.strftime("%Y-%m-%d") for fecha in fechas] + [None], dtype=object)
+    frame["fecha_transaccion"] = fecha_textos[codes]
+    # COPY no pasa por el tipo Centavos: los montos se escriben ya en centavos.
+    for column in ("saldo_inicial", "cargos", "abonos", "saldo_final"):
+        frame[column] = (frame[column].astype(float) * 100).round().astype("int64")
+
+    buffer = StringIO()
+    frame.to_csv(buffer, index=False, header=False, na_rep="\\N")
+    buffer.seek(0)
+
+    copy_sql = (
+        f"COPY {table} ({', '.join(frame.columns)}) "
+        "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    if connection is None:
+        connection = db.session.connection().connection
+    cursor = connection.cursor()
+    try:
+        # La carga no espera el flush del WAL en cada commit: un fallo del
+        # servidor puede perder la última carga, pero nunca deja datos
+        # inconsistentes. SET LOCAL solo dura lo que la transacción actual.
+        cursor.execute("SET LOCAL synchronous_commit = off")
+        cursor.copy_expert(copy_sql, buffer)
+    finally:
+        cursor.close()
+
+
+def _create_copy_staging_table(lote_id):
+    """Tabla de paso UNLOGGED (mismas columnas que el COPY) para la carga en paralelo"""
+    staging = f"transacciones_carga_{uuid.UUID(lote_id).hex}"
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE {staging} AS "
+                f"SELECT {', '.join(COPY_CARGA_COLUMNS)} FROM transacciones WITH NO DATA"
+            )
+            cursor.execute(f"ALTER TABLE {staging} ADD COLUMN fila_carga bigint")
+        finally:
+            cursor.close()
+        connection.commit()
+    finally:
+        connection.close()
+    return staging
+
+
+def _drop_copy_staging_table(staging):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        finally:
+            cursor.close()
+        connection.commit()
+    except Exception as exc:
+        logger.warning("No se pudo borrar la tabla de paso %s: %s", staging, exc)
+    finally:
+        connection.close()
+
+
+def _copy_transacciones_parallel(base, lote_id, usuario, workers, chunk_size, on_block, staging):
+    """COPY de los bloques en paralelo a la tabla de paso, cada uno en su propia conexión"""
+    engine = db.engine
+
+    def _copy_block(start):
+        chunk = base.iloc[start:start + chunk_size]
+        connection = engine.raw_connection()
+        try:
+            _copy_transacciones_postgres(
+                chunk, lote_id, usuario, connection=connection, table=staging, first_row=start
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        return len(chunk)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            executor.submit(_copy_block, start)
+            for start in range(0, len(base), chunk_size)
+        ]
+        for future in as_completed(futures):
+            on_block(future.result())
+    except Exception:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+
+DEFAULT_READER_WORKERS = 4
+
+
 def process_files_to_database(
     file_list: List[Tuple[str, BytesIO]],
     usuario: str = "sistema",
@@ -1583,10 +2421,14 @@ def process_files_to_database(
     selected_ente_siglas: Optional[str] = None,
     selected_ente_nombre: Optional[str] = None,
     selected_ente_grupo: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    copy_workers: Optional[int] = None,
 ):
     """
     Procesa archivos Excel y guarda en base de datos
     Retorna el lote_id para tracking
+    max_workers limita los lectores en paralelo (Config.MAX_WORKERS)
+    copy_workers > 1 reparte el COPY de PostgreSQL entre conexiones (Config.COPY_WORKERS)
     """
     def report(p, m, current_file=None):
         if progress_callback:
@@ -1602,7 +2444,7 @@ def process_files_to_database(
     file_sizes = [_estimate_stream_size(file_info[1]) for file_info in file_list]
     total_input_bytes = sum(file_sizes)
     max_input_bytes = max(file_sizes, default=0)
-    worker_count = min(4, len(file_list))
+    worker_count = max(1, min(max_workers or DEFAULT_READER_WORKERS, len(file_list)))
 
     if max_input_bytes >= 20 * 1024 * 1024 or total_input_bytes >= 40 * 1024 * 1024:
         worker_count = 1
@@ -1620,6 +2462,7 @@ def process_files_to_database(
     )
     db.session.add(lote)
     db.session.commit()
+    copy_staging = None
 
     try:
         logger.info(f"Iniciando procesamiento de {len(file_list)} archivo(s)")
@@ -1636,35 +2479,96 @@ def process_files_to_database(
             f"Procesando lote {lote_id} con {worker_count} worker(s). "
             f"Tamaño total={total_input_bytes:,} bytes, archivo mayor={max_input_bytes:,} bytes"
         )
-        with ThreadPoolExecutor(max_workers=worker_count) as ex:
-            futures = {ex.submit(reader, f): f for f in file_list}
-            for f in as_completed(futures):
-                completed_files += 1
+        def _collect(file_info, read):
+            nonlocal completed_files
+            completed_files += 1
+            try:
+                df, filename = read()
+                if not df.empty:
+                    df.attrs["archivo_origen"] = filename
+                    df["_archivo_orden"] = file_order.get(filename, completed_files - 1)
+                    frames.append(df)
+                    archivos_procesados.append(filename)
+                    logger.info(f"Archivo procesado exitosamente: {filename}")
+                    progress_pct = 5 + int((completed_files / total_files) * 20)
+                    report(progress_pct, f"Archivo procesado: {filename}", filename)
+                else:
+                    archivos_fallidos.append(filename)
+                    logger.warning(f"Archivo no generó registros: {filename}")
+                    progress_pct = 5 + int((completed_files / total_files) * 20)
+                    report(progress_pct, f"Archivo sin registros: {filename}", filename)
+            except Exception as e:
+                logger.error(
+                    "Error procesando archivo %s: %s - %s", file_info[0], type(e).__name__, e,
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
+                archivos_fallidos.append(file_info[0])
+                progress_pct = 5 + int((completed_files / total_files) * 20)
+                report(progress_pct, f"Error en archivo: {file_info[0]}", file_info[0])
+
+        if worker_count == 1:
+            # Un solo lector: se lee en este mismo hilo, sin pool ni futures
+            for file_info in file_list:
+                _collect(file_info, lambda file_info=file_info: reader(file_info))
+        else:
+            executor, use_processes = _create_reader_executor(worker_count, total_input_bytes)
+            pool_broken = False
+            pending = {}
+            remaining = iter(file_list)
+
+            def _submit(f):
+                nonlocal executor
+                if use_processes:
+                    f[1].seek(0)
+                    args = (_read_excel_payload, reader, f[0], f[1].read())
+                else:
+                    args = (reader, f)
                 try:
-                    df, filename = f.result()
-                    if not df.empty:
-                        df['archivo_origen'] = filename
-                        df["_archivo_orden"] = file_order.get(filename, completed_files - 1)
-                        frames.append(df)
-                        archivos_procesados.append(filename)
-                        logger.info(f"Archivo procesado exitosamente: {filename}")
-                        progress_pct = 5 + int((completed_files / total_files) * 20)
-                        report(progress_pct, f"Archivo procesado: {filename}", filename)
-                    else:
-                        archivos_fallidos.append(filename)
-                        logger.warning(f"Archivo no generó registros: {filename}")
-                        progress_pct = 5 + int((completed_files / total_files) * 20)
-                        report(progress_pct, f"Archivo sin registros: {filename}", filename)
-                except Exception as e:
-                    file_info = futures[f]
-                    logger.error(
-                        f"Error procesando archivo {file_info[0]}: {type(e).__name__} - {str(e)}"
+                    return executor.submit(*args)
+                except BrokenProcessPool:
+                    raise
+                except RuntimeError:
+                    # Otra carga reemplazó el pool compartido (otro tamaño) y
+                    # cerró este: lo ya enviado termina y lo nuevo va al vigente.
+                    executor = (
+                        _shared_reader_process_pool(worker_count)
+                        if use_processes else _shared_reader_thread_pool(worker_count)
                     )
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    archivos_fallidos.append(file_info[0])
-                    progress_pct = 5 + int((completed_files / total_files) * 20)
-                    report(progress_pct, f"Error en archivo: {file_info[0]}", file_info[0])
-                    continue
+                    return executor.submit(*args)
+
+            def _submit_next():
+                nonlocal pool_broken
+                for f in remaining:
+                    try:
+                        future = _submit(f)
+                    except BrokenProcessPool as exc:
+                        # Igual que un lector que falla: el archivo cuenta como fallido
+                        pool_broken = True
+
+                        def _broken_read(exc=exc):
+                            raise exc
+
+                        _collect(f, _broken_read)
+                        continue
+                    pending[future] = f
+                    return
+
+            try:
+                # Nunca hay más de worker_count lecturas en curso, aunque el
+                # pool compartido sea más grande (otra carga lo creó así).
+                for _ in range(worker_count):
+                    _submit_next()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _collect(pending.pop(future), future.result)
+                        pool_broken = pool_broken or isinstance(future.exception(), BrokenProcessPool)
+                        _submit_next()
+            finally:
+                # Los pools son compartidos entre cargas; uno de procesos roto
+                # se descarta para que la siguiente carga cree otro.
+                if use_processes and pool_broken:
+                    _discard_reader_process_pool(executor)
 
         logger.info(
             f"Resumen: {len(archivos_procesados)} exitosos, {len(archivos_fallidos)} fallidos"
@@ -1681,7 +2585,19 @@ def process_files_to_database(
             db.session.commit()
             raise ValueError(error_msg)
 
+        # Concatenar en el orden de carga, no en el de terminación de los lectores
+        frames.sort(key=lambda frame: int(frame["_archivo_orden"].iat[0]))
         base = pd.concat(frames, ignore_index=True)
+        # Un código entero por fila en lugar de repetir el nombre del archivo
+        # en cada una; las categorías ordenadas conservan el orden alfabético
+        # al agrupar por archivo.
+        nombres = [frame.attrs["archivo_origen"] for frame in frames]
+        categorias = sorted(set(nombres))
+        posiciones = {nombre: idx for idx, nombre in enumerate(categorias)}
+        base["archivo_origen"] = pd.Categorical.from_codes(
+            np.repeat([posiciones[nombre] for nombre in nombres], [len(frame) for frame in frames]),
+            categories=categorias,
+        )
         base["ente_siglas_catalogo"] = selected_ente_siglas
         base["ente_nombre_catalogo"] = selected_ente_nombre
         base["ente_grupo_catalogo"] = selected_ente_grupo
@@ -1694,46 +2610,34 @@ def process_files_to_database(
             ""
         )
 
-        def _first_non_empty(series):
-            for value in series:
-                if value:
-                    return value
-            return ""
-
-        op_por_poliza = base.groupby("poliza")["orden_pago"].apply(_first_non_empty)
-        base["orden_pago"] = base["poliza"].map(op_por_poliza).where(
+        # Primera orden de pago no vacía de cada póliza, sin una llamada de
+        # Python por grupo: drop_duplicates conserva la primera aparición.
+        op_por_poliza = (
+            base.loc[base["orden_pago"] != "", ["poliza", "orden_pago"]]
+            .drop_duplicates("poliza")
+            .set_index("poliza")["orden_pago"]
+        )
+        base["orden_pago"] = base["poliza"].map(op_por_poliza).fillna("").where(
             base["poliza"] != "",
             base["orden_pago"]
         )
 
         # Dividir cuenta contable
         report(30, "Procesando cuentas contables...")
-        componentes = base["cuenta_contable"].apply(_split_cuenta_contable_vertical)
-        for key in [
-            "genero",
-            "grupo",
-            "rubro",
-            "cuenta",
-            "subcuenta",
-            "dependencia",
-            "unidad_responsable",
-            "centro_costo",
-            "proyecto_presupuestario",
-            "fuente",
-            "subfuente",
-            "tipo_recurso",
-            "partida_presupuestal",
-        ]:
-            base[key] = componentes.apply(lambda x: x[key])
-        base["dependencia"] = base["dependencia"].apply(_normalize_dependency_code)
+        # Cada cuenta distinta se divide una sola vez y se reparte a sus filas
+        # y el código entero se conserva para ordenar y agrupar por cuenta.
+        cuenta_codes, cuentas_unicas = pd.factorize(base["cuenta_contable"], sort=True, use_na_sentinel=False)
+        base["_cuenta_codigo"] = cuenta_codes
+        componentes = _cuenta_components(cuentas_unicas).take(cuenta_codes)
+        componentes.index = base.index
+        base[CUENTA_COMPONENT_COLUMNS] = componentes
 
         if expected_dependency:
             report(40, "Validando selección del Catálogo General...")
-            dependencias_por_archivo = (
-                base.groupby("archivo_origen")["dependencia"]
-                .apply(lambda series: sorted({code for code in series if code}))
-                .to_dict()
-            )
+            dependencias_por_archivo = {archivo: [] for archivo in sorted(base["archivo_origen"].unique())}
+            pares = base.loc[base["dependencia"] != "", ["archivo_origen", "dependencia"]].drop_duplicates()
+            for archivo, code in sorted(pares.itertuples(index=False, name=None)):
+                dependencias_por_archivo[archivo].append(code)
             archivos_invalidos = []
             for filename, detected_codes in dependencias_por_archivo.items():
                 if not detected_codes or any(code != expected_dependency for code in detected_codes):
@@ -1774,25 +2678,27 @@ def process_files_to_database(
         base["_archivo_orden"] = pd.to_numeric(base.get("_archivo_orden", 0), errors="coerce").fillna(0).astype(int)
         base["_orden_auxiliar"] = pd.to_numeric(base.get("orden_auxiliar", 0), errors="coerce").fillna(0).astype(int)
         periodo_inicio_series = base["periodo_inicio"] if "periodo_inicio" in base.columns else base["fecha"]
-        base["_periodo_inicio_dt"] = pd.to_datetime(
-            periodo_inicio_series,
-            format="%d/%m/%Y",
-            errors="coerce"
-        )
-        base["fecha_transaccion"] = pd.to_datetime(
-            base["fecha"], format="%d/%m/%Y", errors="coerce"
-        )
+        # Muchas filas comparten fecha: se parsea cada valor distinto una sola vez.
+        base["_periodo_inicio_dt"] = _parse_dates_unique(periodo_inicio_series)
+        base["fecha_transaccion"] = _parse_dates_unique(base["fecha"])
+        # Un solo ordenamiento por cuenta y periodo; la siembra, la reconstrucción
+        # de saldos y la inserción reutilizan este orden.
+        base = _sort_by_account(base)
 
         if seed_historical_opening_balances:
             report(55, "Sembrando saldos iniciales desde historial...")
-            base = _seed_historical_opening_balances(
-                base,
-                selected_ente_siglas,
-            )
+            # Una consulta de historial por cuenta: sin autoflush cada una evita
+            # revisar la sesión antes de ejecutarse.
+            with db.session.no_autoflush:
+                base = _seed_historical_opening_balances(
+                    base,
+                    selected_ente_siglas,
+                    presorted=True,
+                )
 
         # Reconstruir el auxiliar en orden estable y respetando la naturaleza de la cuenta.
         report(60, "Calculando saldos acumulativos...")
-        base = _rebuild_account_balances(base)
+        base = _rebuild_account_balances(base, presorted=True)
 
         report(65, "Validando integridad del auxiliar...")
         _validate_reconstructed_rollforwards(base, lote_id)
@@ -1805,7 +2711,7 @@ def process_files_to_database(
 
         # Generar hash por registro para evitar duplicados
         report(70, "Generando firmas de registros...")
-        base["hash_registro"] = base.apply(_hash_transaccion_row, axis=1)
+        base["hash_registro"] = _hash_transacciones(base)
 
         total_before_dedupe = len(base)
         base = base.drop_duplicates(subset=["hash_registro"])
@@ -1835,68 +2741,89 @@ def process_files_to_database(
 
         # Insertar en base de datos en lotes
         report(80, f"Insertando {len(base):,} registros en base de datos...")
-        logger.info(f"Iniciando inserción de {len(base)} registros en lotes de {1000}")
+        use_copy = db.session.get_bind().dialect.name == "postgresql"
+        # Cada bloque de COPY es un solo flujo al servidor: bloques grandes
+        # reducen los viajes; el CSV en memoria sigue acotado por bloque.
+        chunk_size = COPY_CHUNK_SIZE if use_copy else INSERT_CHUNK_SIZE
+        logger.info(f"Iniciando inserción de {len(base)} registros en lotes de {chunk_size}")
 
-        chunk_size = 1000
         total_insertados = 0
+        insert_stmt = Transaccion.__table__.insert().values(
+            lote_id=lote_id,
+            usuario_carga=usuario,
+        )
 
-        for i in range(0, len(base), chunk_size):
-            chunk = base.iloc[i:i + chunk_size]
-
-            transacciones = []
-            for _, row in chunk.iterrows():
-                trans = Transaccion(
-                    lote_id=lote_id,
-                    archivo_origen=row['archivo_origen'],
-                    usuario_carga=usuario,
-                    ente_siglas_catalogo=row['ente_siglas_catalogo'],
-                    ente_nombre_catalogo=row['ente_nombre_catalogo'],
-                    ente_grupo_catalogo=row['ente_grupo_catalogo'],
-                    cuenta_contable=row['cuenta_contable'],
-                    nombre_cuenta=row['nombre_cuenta'],
-                    genero=row['genero'],
-                    grupo=row['grupo'],
-                    rubro=row['rubro'],
-                    cuenta=row['cuenta'],
-                    subcuenta=row['subcuenta'],
-                    dependencia=row['dependencia'],
-                    unidad_responsable=row['unidad_responsable'],
-                    centro_costo=row['centro_costo'],
-                    proyecto_presupuestario=row['proyecto_presupuestario'],
-                    fuente=row['fuente'],
-                    subfuente=row['subfuente'],
-                    tipo_recurso=row['tipo_recurso'],
-                    partida_presupuestal=row['partida_presupuestal'],
-                    fecha_transaccion=row['fecha_transaccion'],
-                    poliza=row['poliza'],
-                    beneficiario=row['beneficiario'],
-                    descripcion=row['descripcion'],
-                    orden_pago=row['orden_pago'],
-                    saldo_inicial=row['saldo_inicial'],
-                    cargos=row['cargos'],
-                    abonos=row['abonos'],
-                    saldo_final=row['saldo_final'],
-                    hash_registro=row['hash_registro']
-                )
-                transacciones.append(trans)
+        def _block_inserted(count):
+            nonlocal total_insertados
+            total_insertados += count
+            progress_pct = 80 + int((total_insertados / len(base)) * 15)
+            report(progress_pct, f"Insertados {total_insertados:,} de {len(base):,} registros")
 
+        copy_workers = max(1, copy_workers or 1)
+        if use_copy and copy_workers > 1 and len(base) > chunk_size:
+            # Las conexiones en paralelo copian a una tabla de paso UNLOGGED que
+            # nadie más lee; el paso a transacciones es un solo INSERT ... SELECT
+            # en la transacción de la sesión, que se confirma junto con el lote.
+            # Si algo falla, transacciones no recibe ninguna fila.
+            copy_staging = _create_copy_staging_table(lote_id)
             try:
-                db.session.bulk_save_objects(transacciones)
-                db.session.commit()
-                logger.debug(
-                    f"Lote {i // chunk_size + 1} insertado correctamente ({len(chunk)} registros)"
+                _copy_transacciones_parallel(
+                    base, lote_id, usuario, copy_workers, chunk_size, _block_inserted, copy_staging
                 )
+                columns = ", ".join(COPY_CARGA_COLUMNS)
+                cursor = db.session.connection().connection.cursor()
+                try:
+                    cursor.execute("SET LOCAL synchronous_commit = off")
+                    cursor.execute(
+                        f"INSERT INTO transacciones ({columns}) "
+                        f"SELECT {columns} FROM {copy_staging} ORDER BY fila_carga"
+                    )
+                    # Dentro de la misma transacción: se borra solo si la carga se confirma
+                    cursor.execute(f"DROP TABLE {copy_staging}")
+                finally:
+                    cursor.close()
             except Exception as e:
                 logger.error(
-                    f"Error insertando lote {i // chunk_size + 1}: {type(e).__name__} - {str(e)}"
+                    "Error insertando lote en paralelo: %s - %s", type(e).__name__, e,
+                    exc_info=True,
                 )
-                logger.error(f"Traceback: {traceback.format_exc()}")
                 db.session.rollback()
                 raise
+        else:
+            # Todos los bloques van en una sola transacción: un único commit (junto con
+            # la actualización del lote) y, si un bloque falla, no queda el lote a medias.
+            # La sesión no tiene nada pendiente durante la inserción: sin autoflush
+            # ningún execute revisa el mapa de identidad.
+            with db.session.no_autoflush:
+                for i in range(0, len(base), chunk_size):
+                    chunk = base.iloc[i:i + chunk_size]
+
+                    try:
+                        if use_copy:
+                            _copy_transacciones_postgres(chunk, lote_id, usuario)
+                        else:
+                            # Diccionarios armados desde listas por columna: to_dict(orient="records")
+                            # revisa y convierte cada celda por separado.
+                            records = [
+                                dict(zip(TRANSACCION_INSERT_COLUMNS, values))
+                                for values in zip(*(chunk[column].tolist() for column in TRANSACCION_INSERT_COLUMNS))
+                            ]
+                            db.session.execute(insert_stmt, records)
+                        logger.debug(
+                            "Lote %d insertado correctamente (%d registros)",
+                            i // chunk_size + 1,
+                            len(chunk),
+                        )
+                    except Exception as e:
+                        # Falla que aborta la carga: el traceback se registra siempre
+                        logger.error(
+                            "Error insertando lote %s: %s - %s", i // chunk_size + 1, type(e).__name__, e,
+                            exc_info=True,
+                        )
+                        db.session.rollback()
+                        raise
 
-            total_insertados += len(chunk)
-            progress_pct = 80 + int((total_insertados / len(base)) * 15)
-            report(progress_pct, f"Insertados {total_insertados:,} de {len(base):,} registros")
+                    _block_inserted(len(chunk))
 
         # Actualizar lote
         lote.total_registros = len(base)
@@ -1919,9 +2846,11 @@ def process_files_to_database(
 
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)}"
-        logger.error(f"Error fatal en procesamiento: {error_msg}")
-        logger.error(f"Traceback completo:\n{traceback.format_exc()}")
+        logger.error("Error fatal en procesamiento: %s", error_msg, exc_info=True)
         lote.estado = 'error'
         lote.mensaje = error_msg
         db.session.commit()
+        if copy_staging:
+            # La transacción de la carga ya terminó: nada bloquea la tabla de paso
+            _drop_copy_staging_table(copy_staging)
         raise
@@ -1,8 +1,12 @@
+import io
 import os
 import tempfile
+import time
 import unittest
 from datetime import date
 
+from openpyxl import load_workbook
+
 
 DB_FILE = tempfile.NamedTemporaryFile(suffix=".sqlite", delete=False)
 DB_FILE.close()
@@ -184,6 +188,33 @@ class CatalogosConsultaApiTests(unittest.TestCase):
         self.assertIn("total_registros", resumen_payload)
         self.assertIn("coincide", resumen_payload)
 
+    def test_finished_upload_job_releases_its_condition(self):
+        self._login_as("luis")
+
+        response = self.client.post(
+            "/api/process",
+            data={
+                "archivo": (io.BytesIO(b"no es un xlsx"), "invalido.xlsx"),
+                "catalogo_item_id": "entes:1",
+                "allow_duplicates": "true",
+            },
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 200)
+        job_id = response.get_json()["job_id"]
+
+        deadline = time.time() + 10
+        job = None
+        while time.time() < deadline:
+            job = self.client.get(f"/api/progress/{job_id}?format=json").get_json()
+            if job.get("done"):
+                break
+            time.sleep(0.05)
+
+        self.assertTrue(job["done"])
+        self.assertTrue(job["error"])
+        self.assertEqual(self.app.extensions["job_conditions"], {})
+
     def test_luis_and_juan_do_not_see_municipios_in_catalogo_or_transacciones(self):
         self._seed_estatal_and_municipal_transacciones()
 
@@ -217,6 +248,39 @@ class CatalogosConsultaApiTests(unittest.TestCase):
                 all(item["ambito"] != "MUNICIPAL" for item in ente_catalogo_items)
             )
 
+    def test_reporte_continues_after_last_seen_key(self):
+        self._seed_estatal_and_municipal_transacciones()
+        self._login_as("luis")
+
+        with self.app.app_context():
+            estatal_id = (
+                db.session.query(Transaccion.id)
+                .filter_by(hash_registro="hash-estatal-001")
+                .scalar()
+            )
+
+        def report_rows(payload):
+            response = self.client.post("/api/reportes/generar", json=payload)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("X-Reporte-Siguiente", response.headers)
+            sheet = load_workbook(io.BytesIO(response.data)).active
+            return [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)]
+
+        self.assertEqual(report_rows({}), ["111111111111111111111"])
+        self.assertEqual(
+            report_rows({"last_seen_key": ["2026-01-14", "", 0]}),
+            ["111111111111111111111"],
+        )
+        self.assertEqual(
+            report_rows({"last_seen_key": ["2026-01-15", "111111111111111111111", estatal_id]}),
+            [],
+        )
+
+        invalid_response = self.client.post(
+            "/api/reportes/generar", json={"last_seen_key": ["15/01/2026", "", 1]}
+        )
+        self.assertEqual(invalid_response.status_code, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,15 @@
 from io import BytesIO
 import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
+
+import pandas as pd
 
 from flask import Flask
 from openpyxl import Workbook
+from sqlalchemy import func, text
 
 from scripts.utils import (
     LoteCarga,
@@ -99,6 +105,59 @@ class ImportBalanceTests(unittest.TestCase):
         self.assertEqual(df.iloc[0]["abonos"], "0")
         self.assertEqual(df.iloc[0]["saldo_final"], "109")
 
+    def test_read_one_excel_classifies_columns_without_amount_headers(self):
+        rows = [
+            ["FECHA", "POLIZA", "CONCEPTO", "", "", "IMPORTES", "", "", "SALDO"],
+            ["CUENTA CONTABLE: 111100000000000000001 - ACTIVO"],
+            ["", "SALDO INICIAL CUENTA AL 01/01/2025", "", "1,000.00"],
+            ["02/01/2025", "P-1", "PROVEEDOR", "PAGO", "125", "1,000.00", "200.00", "0.00", "800.00"],
+            ["03/01/2025", "P-2", "PAGO", "", "7", "8", "50.00", "1,150.00"],
+            ["04/01/2025", "P-3", "SOLO TEXTO", "", "", "10.00"],
+        ]
+
+        df, _ = _read_one_excel(("heuristico.xlsx", _build_auxiliar_bytes(rows)))
+
+        self.assertEqual(len(df), 2)
+        first, second = df.iloc[0], df.iloc[1]
+        self.assertEqual(first["cuenta_contable"], "111100000000000000001")
+        self.assertEqual(first["orden_pago"], "125")
+        self.assertEqual(first["beneficiario"], "PROVEEDOR")
+        self.assertEqual(first["descripcion"], "PAGO")
+        self.assertEqual(
+            [first["saldo_inicial"], first["cargos"], first["abonos"], first["saldo_final"]],
+            ["1,000.00", "200.00", "0.00", "800.00"],
+        )
+        # La primera candidata a O.P. lo es; el segundo entero cuenta como importe
+        self.assertEqual(second["orden_pago"], "7")
+        self.assertEqual(second["descripcion"], "PAGO")
+        self.assertEqual(
+            [second["saldo_inicial"], second["cargos"], second["abonos"], second["saldo_final"]],
+            ["1,000.00", "8", "50.00", "1,150.00"],
+        )
+
+    def test_process_files_to_database_limits_parallel_reads_to_max_workers(self):
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+
+        def slow_reader(file_data):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return pd.DataFrame(), file_data[0]
+
+        files = [(f"archivo_{idx}.xlsx", BytesIO(b"x")) for idx in range(6)]
+        with self.app.app_context():
+            with mock.patch("scripts.utils._read_one_excel", slow_reader):
+                with self.assertRaisesRegex(ValueError, "No se pudo procesar"):
+                    process_files_to_database(files, usuario="test", max_workers=2)
+
+        self.assertEqual(max_running, 2)
+
     def test_process_files_to_database_rejects_unbalanced_batch(self):
         rows = _base_auxiliar_rows() + [
             ["CUENTA CONTABLE: 111100000000000000001 - ACTIVO", "", "", "", "", "", "", "", ""],
@@ -152,6 +211,38 @@ class ImportBalanceTests(unittest.TestCase):
             self.assertEqual(lote.estado, "completado")
             self.assertEqual(lote.total_registros, 2)
 
+    def test_process_files_to_database_stores_amounts_as_cents(self):
+        activo = _build_auxiliar_file(
+            "111100000000000000001",
+            "ACTIVO",
+            0,
+            [["2025-01-02", "TR - 1", "", "MOVIMIENTO ACTIVO", "", "", 100.35, 0, 100.35]],
+        )
+        ingreso = _build_auxiliar_file(
+            "415100000000000000001",
+            "INGRESO",
+            0,
+            [["2025-01-02", "TR - 1", "", "MOVIMIENTO INGRESO", "", "", 0, 100.35, 100.35]],
+        )
+
+        with self.app.app_context():
+            process_files_to_database(
+                [("activo.xlsx", activo), ("ingreso.xlsx", ingreso)],
+                usuario="test",
+                selected_ente_siglas="OPD_SALUD",
+                selected_ente_nombre="ENTE DE PRUEBA",
+                selected_ente_grupo="ESTATALES",
+            )
+
+            raw_cargos = db.session.execute(
+                text("SELECT SUM(cargos) FROM transacciones")
+            ).scalar()
+            self.assertEqual(raw_cargos, 10035)
+            self.assertEqual(
+                db.session.query(func.sum(Transaccion.cargos)).scalar(),
+                100.35,
+            )
+
     def test_process_files_to_database_accepts_presupuestal_rollforward(self):
         presupuesto = _build_auxiliar_file(
             "8110002010001P6139121",